@@ -0,0 +1,143 @@
+"""
+Benchmark of the filter engines.
+
+The panflute engine and the JSON engine are run by pandoc-like processes
+on a synthetic JSON document made of paragraphs of prose with a few
+decorated spans and divs. The time and the peak memory of each process
+are measured, the icons being rendered beforehand.
+
+Usage: python benchmarks/bench_engine.py [--words 1000000] [--every 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+WORDS_PER_PARAGRAPH = 100
+
+FILTER = """
+import resource, sys
+import pandoc_latex_tip._main as m
+m.main()
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+"""
+
+
+def build(words: int, every: int) -> bytes:
+    """
+    Build a synthetic JSON document.
+
+    The document is built as text, so that the benchmark process stays
+    small: the peak memory of a child process starts from the memory of its
+    parent.
+
+    Parameters
+    ----------
+    words
+        The number of words
+    every
+        The number of paragraphs between two decorated elements
+
+    Returns
+    -------
+    bytes
+        The JSON document.
+    """
+    inlines: list[dict[str, Any]] = []
+    for word in range(WORDS_PER_PARAGRAPH):
+        inlines.append({"t": "Str", "c": f"word{word}"})
+        inlines.append({"t": "SoftBreak" if word % 10 == 9 else "Space"})
+    span = {"t": "Span", "c": [["", ["tip"], []], [{"t": "Str", "c": "tip"}]]}
+    plain = json.dumps({"t": "Para", "c": inlines})
+    decorated = json.dumps({"t": "Para", "c": [*inlines, span]})
+    divided = json.dumps(
+        {"t": "Div", "c": [["", ["tip"], []], [json.loads(decorated)]]}
+    )
+    blocks = []
+    for number in range(words // WORDS_PER_PARAGRAPH):
+        if number % (10 * every) == 0:
+            blocks.append(divided)
+        elif number % every == 0:
+            blocks.append(decorated)
+        else:
+            blocks.append(plain)
+    meta = {
+        "pandoc-latex-tip": {
+            "t": "MetaList",
+            "c": [
+                {
+                    "t": "MetaMap",
+                    "c": {
+                        "classes": {
+                            "t": "MetaList",
+                            "c": [
+                                {"t": "MetaInlines", "c": [{"t": "Str", "c": "tip"}]}
+                            ],
+                        },
+                        "icons": {
+                            "t": "MetaInlines",
+                            "c": [{"t": "Str", "c": "fa-check"}],
+                        },
+                    },
+                }
+            ],
+        }
+    }
+    head = json.dumps({"pandoc-api-version": [1, 23, 1], "meta": meta})
+    return f'{head[:-1]},"blocks":[{",".join(blocks)}]}}'.encode()
+
+
+def run(engine: str, source: bytes) -> bytes:
+    """
+    Run the filter with an engine and print the time and the peak memory.
+
+    Parameters
+    ----------
+    engine
+        The engine name
+    source
+        The JSON document
+
+    Returns
+    -------
+    bytes
+        The filtered JSON document.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FILTER, "latex"],
+        input=source,
+        capture_output=True,
+        check=True,
+        env=dict(os.environ, PANDOC_LATEX_TIP_ENGINE=engine),
+    )
+    elapsed = time.perf_counter() - start
+    peak = int(result.stderr.split()[-1])
+    print(f"{engine:>8}: {elapsed:6.2f} s, {peak / 1024:6.0f} MiB")
+    return result.stdout
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--words", type=int, default=1000000)
+    parser.add_argument("--every", type=int, default=50)
+    args = parser.parse_args()
+
+    source = build(args.words, args.every)
+    print(f"{len(source) / 2**20:.0f} MiB of JSON")
+    run("json", build(1000, 1))
+    outputs = [run(engine, source) for engine in ("panflute", "json")]
+    print("identical outputs" if outputs[0] == outputs[1] else "different outputs")
+
+
+if __name__ == "__main__":
+    main()
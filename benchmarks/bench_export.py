@@ -0,0 +1,123 @@
+"""
+Benchmark of the icon rasterization.
+
+The single-pass pipeline of IconFont.render_icon is compared to the former
+multi-pass pipeline (draw the glyph twice, colourize a full-size solid
+image and paste its crop on a fourth image). The image memory is measured
+with the Pillow allocator statistics, using small blocks.
+
+Usage: python benchmarks/bench_export.py [--size 512] [--count 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import PIL.Image
+import PIL.ImageDraw
+
+from pandoc_latex_tip._files import get_truetype
+from pandoc_latex_tip._icons import IconFont, load_icons
+
+BLOCK_SIZE = 4096
+
+
+def legacy_render(icon_font: IconFont, icon: str, size: int, color: str) -> None:
+    """
+    Render an icon with the former multi-pass pipeline.
+
+    Parameters
+    ----------
+    icon_font
+        The icon font
+    icon
+        The icon name
+    size
+        The icon size in pixels
+    color
+        The icon color
+    """
+    org_size = size
+    size = max(150, size)
+    font = get_truetype(icon_font.ttf_file, icon_font.fit_size(icon, size))
+    character = icon_font.css_icons[icon]
+
+    image = PIL.Image.new("RGBA", (size, size), color=(0, 0, 0, 0))
+    draw = PIL.ImageDraw.Draw(image)
+    width = draw.textlength(character, font=font)
+    position = ((size - width) / 2, 0)
+    draw.text(position, character, font=font, fill=color, anchor="lt")
+    bbox = image.getbbox()
+
+    image_mask = PIL.Image.new("L", (size, size))
+    PIL.ImageDraw.Draw(image_mask).text(
+        position, character, font=font, fill=255, anchor="lt"
+    )
+    icon_image = PIL.Image.new("RGBA", (size, size), color)
+    icon_image.putalpha(image_mask)
+    if bbox:
+        icon_image = icon_image.crop(bbox)
+        border_w = int((size - (bbox[2] - bbox[0])) / 2)
+        border_h = int((size - (bbox[3] - bbox[1])) / 2)
+        out_image = PIL.Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        out_image.paste(icon_image, (border_w, border_h))
+        if org_size != size:
+            out_image.resize((org_size, org_size), PIL.Image.Resampling.LANCZOS)
+
+
+def run(pipeline: str, fonts: list[tuple[IconFont, str]], size: int) -> None:
+    """
+    Render icons with a pipeline and print the time and the image memory.
+
+    Parameters
+    ----------
+    pipeline
+        "legacy" or "single"
+    fonts
+        The icon fonts and the icon names
+    size
+        The icon size in pixels
+    """
+    PIL.Image.core.reset_stats()
+    start = time.perf_counter()
+    for icon_font, name in fonts:
+        if pipeline == "legacy":
+            legacy_render(icon_font, name, size, "red")
+        else:
+            icon_font.render_icon(name, size, "red")
+    elapsed = time.perf_counter() - start
+    allocated = PIL.Image.core.get_stats()["allocated_blocks"] * BLOCK_SIZE
+    print(
+        f"{pipeline:>6}: {len(fonts)} icons in {elapsed:.3f}s "
+        f"({1000 * elapsed / len(fonts):.2f} ms/icon), "
+        f"{allocated / len(fonts) / 1024:.0f} KiB of images/icon"
+    )
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+
+    PIL.Image.core.set_block_size(BLOCK_SIZE)
+    PIL.Image.core.set_blocks_max(0)
+
+    registry = load_icons()
+    names = list(registry)[:: max(1, len(registry) // args.count)][: args.count]
+    fonts = [(registry[name], name) for name in names]
+
+    # Load the Pillow fonts beforehand, they are shared by both pipelines
+    for icon_font, name in fonts:
+        get_truetype(icon_font.ttf_file, icon_font.fit_size(name, max(150, args.size)))
+
+    for pipeline in ("legacy", "single"):
+        run(pipeline, fonts, args.size)
+
+
+if __name__ == "__main__":
+    main()
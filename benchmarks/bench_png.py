@@ -0,0 +1,86 @@
+"""
+Benchmark of the PNG encoding.
+
+The size of the images and the encoding time are compared for several
+compression levels, palettes and optimization settings, across the
+glyphs of the Font Awesome sets. The coverage masks are rendered
+beforehand, only the encoding is measured.
+
+Usage: python benchmarks/bench_png.py [--size 75] [--color orange]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+import PIL.Image
+
+from pandoc_latex_tip._icons import PngEncoding, load_icons, save_png
+
+ENCODINGS: list[PngEncoding] = [
+    (6, 0, False),
+    (1, 0, False),
+    (9, 0, False),
+    (9, 0, True),
+    (6, 256, False),
+    (6, 16, False),
+    (9, 16, True),
+    (9, 4, True),
+]
+
+
+def run(masks: list[PIL.Image.Image], color: str, encoding: PngEncoding) -> None:
+    """
+    Encode the masks with an encoding and print the size and the time.
+
+    Parameters
+    ----------
+    masks
+        The coverage masks
+    color
+        The icon color
+    encoding
+        The compression level, palette levels and optimization
+    """
+    size = 0
+    start = time.perf_counter()
+    for mask in masks:
+        output = io.BytesIO()
+        save_png(mask, color, output, encoding)
+        size += output.tell()
+    elapsed = time.perf_counter() - start
+    compress_level, levels, optimize = encoding
+    print(
+        f"level {compress_level}, palette {levels:>3}, optimize {optimize!s:>5}: "
+        f"{size / 1024:8.0f} KiB ({size / len(masks):6.0f} B/icon), "
+        f"{1000 * elapsed / len(masks):.2f} ms/icon"
+    )
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--size", type=int, default=75)
+    parser.add_argument("--color", default="orange")
+    args = parser.parse_args()
+
+    registry = load_icons()
+    masks = []
+    for definition in registry.definitions:
+        if definition["prefix"] not in ("fa-", "far-", "fab-"):
+            continue
+        icon_font = registry.icon_font(definition)
+        glyphs = {character: name for name, character in icon_font.css_icons.items()}
+        masks.extend(icon_font.render_mask(name, args.size) for name in glyphs.values())
+    print(f"{len(masks)} glyphs of {args.size}x{args.size} pixels")
+
+    for encoding in ENCODINGS:
+        run(masks, args.color, encoding)
+
+
+if __name__ == "__main__":
+    main()
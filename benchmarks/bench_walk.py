@@ -0,0 +1,113 @@
+"""
+Benchmark of the document traversal.
+
+The panflute traversal, which calls the tip transformation on every
+element, is compared to the traversal of the candidate elements, on a
+synthetic document made of paragraphs of prose with a few decorated spans
+and divs. The document is prepared beforehand, only the traversal is
+measured.
+
+Usage: python benchmarks/bench_walk.py [--words 1000000] [--every 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+from collections.abc import Callable
+
+from panflute import Div, Doc, Para, SoftBreak, Space, Span, Str, convert_text
+
+from pandoc_latex_tip._main import prepare, tip
+from pandoc_latex_tip._walk import walk_candidates
+
+METADATA = """
+---
+pandoc-latex-tip:
+  - classes: [tip]
+    icons: [fa-check]
+---
+"""
+
+WORDS_PER_PARAGRAPH = 100
+
+
+def build(words: int, every: int) -> Doc:
+    """
+    Build a synthetic document.
+
+    Parameters
+    ----------
+    words
+        The number of words
+    every
+        The number of paragraphs between two decorated elements
+
+    Returns
+    -------
+    Doc
+        The prepared document.
+    """
+    doc = convert_text(METADATA, standalone=True)
+    doc.format = "latex"
+    for number in range(words // WORDS_PER_PARAGRAPH):
+        inlines = []
+        for word in range(WORDS_PER_PARAGRAPH):
+            inlines.append(Str(f"word{word}"))
+            inlines.append(SoftBreak() if word % 10 == 9 else Space())
+        if number % every == 0:
+            inlines.append(Span(Str("tip"), classes=["tip"]))
+        if number % (10 * every) == 1:
+            doc.content.append(Div(Para(*inlines), classes=["tip"]))
+        else:
+            doc.content.append(Para(*inlines))
+    prepare(doc)
+    return doc
+
+
+def run(name: str, walk: Callable[[Doc], None], words: int, every: int) -> None:
+    """
+    Traverse a fresh document and print the time per element.
+
+    Parameters
+    ----------
+    name
+        The traversal name
+    walk
+        The traversal
+    words
+        The number of words
+    every
+        The number of paragraphs between two decorated elements
+    """
+    doc = build(words, every)
+    elements = []
+    doc.walk(lambda elem, _doc: elements.append(None))
+    gc.collect()
+    start = time.perf_counter()
+    walk(doc)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>10}: {elapsed:6.2f} s for {len(elements)} elements, "
+        f"{1e9 * elapsed / len(elements):6.0f} ns/element"
+    )
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--words", type=int, default=1000000)
+    parser.add_argument("--every", type=int, default=50)
+    args = parser.parse_args()
+
+    run("panflute", lambda doc: doc.walk(tip, doc), args.words, args.every)
+    run(
+        "candidates", lambda doc: walk_candidates(doc, tip, doc), args.words, args.every
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,50 @@
 """
 pandoc_latex_tip package.
+
+The filter and the application are imported on first access, so that
+running the filter never imports the application framework.
 """
 
-from ._app import app  # noqa: TID252
-from ._main import main  # noqa: TID252
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._app import app  # noqa: TID252
+    from ._main import main  # noqa: TID252
 
 __all__ = ("main", "app")
 
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the filter or the application on first access.
+
+    Parameters
+    ----------
+    name
+        The attribute name
+
+    Returns
+    -------
+    Any
+        The main function of the filter or of the application.
+
+    Raises
+    ------
+    AttributeError
+        If the attribute does not exist.
+    """
+    # pylint: disable=import-outside-toplevel
+    if name == "main":
+        from ._main import main  # noqa: TID252
+
+        return main
+    if name == "app":
+        from ._app import app  # noqa: TID252
+
+        return app
+    message = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(message)
+
+
 if __name__ == "__main__":
-    main()
+    __getattr__("main")()
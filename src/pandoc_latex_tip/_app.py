@@ -2,9 +2,11 @@
 App module.
 """
 
+import os
 import pathlib
 import shutil
 import sys
+import time
 from importlib.metadata import version
 
 from cleo.application import Application
@@ -15,7 +17,30 @@ import platformdirs
 
 import yaml
 
-from ._main import get_core_icons, main  # noqa: TID252
+from ._cache import (  # noqa: TID252
+    AGE_UNITS,
+    SIZE_UNITS,
+    clear,
+    installed_folder,
+    list_entries,
+    parse_quantity,
+    prune,
+    read_runs,
+)
+from ._icons import (  # noqa: TID252
+    DEFAULT_ENCODING,
+    QUALITIES,
+    get_core_icons,
+    load_icons,
+)
+from ._main import main  # noqa: TID252
+from ._render import (  # noqa: TID252
+    DEFAULT_DPI,
+    DEFAULT_EM_SIZE,
+    pixel_size,
+    plan_icon_sets,
+    render_all,
+)
 
 name_arg = argument(
     "name",
@@ -42,6 +67,111 @@ prefix_opt = option(
     flag=False,
 )
 
+max_size_opt = option(
+    "max-size",
+    description="Maximum size of the cache (for example 500M)",
+    flag=False,
+)
+max_age_opt = option(
+    "max-age",
+    description="Maximum age of the unused entries (for example 30d)",
+    flag=False,
+)
+
+prefixes_opt = option(
+    "prefix",
+    short_name="p",
+    description="Prefix of a set of icons to render (all the sets by default)",
+    flag=False,
+    multiple=True,
+)
+colors_opt = option(
+    "colors",
+    short_name="c",
+    description="Comma-separated list of colors",
+    flag=False,
+    default="black",
+)
+jobs_opt = option(
+    "jobs",
+    short_name="j",
+    description="Number of rendering processes (number of processors by default)",
+    flag=False,
+)
+folder_opt = option(
+    "folder",
+    description="Cache folder to fill (the user cache folder by default)",
+    flag=False,
+)
+image_format_opt = option(
+    "image-format",
+    description="Image format (png or pdf)",
+    flag=False,
+    default="png",
+)
+sizes_opt = option(
+    "size",
+    short_name="s",
+    description="Size of the icons in the documents (18pt by default)",
+    flag=False,
+    multiple=True,
+)
+dpi_opt = option(
+    "dpi",
+    description="Resolution of the bitmap images in dots per inch",
+    flag=False,
+    default=f"{DEFAULT_DPI:g}",
+)
+em_size_opt = option(
+    "em-size",
+    description="Size of the em unit in points",
+    flag=False,
+    default=f"{DEFAULT_EM_SIZE:g}",
+)
+quality_opt = option(
+    "quality",
+    description="Quality of the bitmap images (fast, balanced or best)",
+    flag=False,
+    default="balanced",
+)
+png_compress_level_opt = option(
+    "png-compress-level",
+    description="Compression level of the PNG images (0 to 9)",
+    flag=False,
+    default=str(DEFAULT_ENCODING[0]),
+)
+png_palette_opt = option(
+    "png-palette",
+    description="Levels of transparency of the PNG palette (0 for no palette)",
+    flag=False,
+    default=str(DEFAULT_ENCODING[1]),
+)
+png_optimize_opt = option(
+    "png-optimize",
+    description="Optimize the PNG images",
+)
+
+
+def human_size(size: float) -> str:
+    """
+    Format a size in bytes.
+
+    Parameters
+    ----------
+    size
+        The size in bytes
+
+    Returns
+    -------
+    str
+        The size with a binary unit.
+    """
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
 
 class InfoCommand(Command):  # type: ignore[misc]
     """
@@ -80,6 +210,7 @@ class InfoCommand(Command):  # type: ignore[misc]
             f"<info>Cache dir</>:      <comment>"
             f"{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}</>"
         )
+        self.line(f"<info>Read-only dir</>:  <comment>{installed_folder()}</>")
         return 0
 
 
@@ -465,6 +596,259 @@ class IconsListCommand(Command):  # type: ignore[misc]
         return 0
 
 
+class CacheStatsCommand(Command):  # type: ignore[misc]
+    """
+    CacheStatsCommand.
+    """
+
+    name = "cache stats"
+    description = "Display statistics about the cache"
+    help = (
+        "The hits and misses are the numbers of images found in the cache "
+        "and rendered during the last 100 runs of the filter."
+    )
+
+    def handle(self) -> int:
+        """
+        Handle cache stats command.
+
+        Returns
+        -------
+        int
+            status code
+        """
+        folder = platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir
+        entries = list_entries(folder)
+        runs = read_runs(folder)
+        hits = sum(run[1] for run in runs)
+        misses = sum(run[2] for run in runs)
+        self.line("<b>Cache</>")
+        self.line(f"<info>Cache dir</>: <comment>{folder}</>")
+        self.line(f"<info>Entries</>:   <comment>{len(entries)}</>")
+        self.line(
+            f"<info>Size</>:      "
+            f"<comment>{human_size(sum(entry[1] for entry in entries))}</>"
+        )
+        self.line("")
+        self.line("<b>Recent runs</>")
+        self.line(f"<info>Runs</>:      <comment>{len(runs)}</>")
+        self.line(f"<info>Hits</>:      <comment>{hits}</>")
+        self.line(f"<info>Misses</>:    <comment>{misses}</>")
+        if hits + misses:
+            self.line(
+                f"<info>Hit ratio</>: <comment>{100 * hits / (hits + misses):.1f}%</>"
+            )
+        return 0
+
+
+class CachePruneCommand(Command):  # type: ignore[misc]
+    """
+    CachePruneCommand.
+    """
+
+    name = "cache prune"
+    description = "Remove the least recently used entries of the cache"
+    options = (max_size_opt, max_age_opt)
+    help = (
+        "The entries not used for more than the maximum age (in s, m, h, d or w, "
+        "days by default) are removed, then the least recently used entries are "
+        "removed until the cache does not exceed the maximum size "
+        "(in K, M or G, bytes by default)."
+    )
+
+    def handle(self) -> int:
+        """
+        Handle cache prune command.
+
+        Returns
+        -------
+        int
+            status code
+
+        Raises
+        ------
+        ValueError
+            If an error occurs.
+        """
+        if not self.option("max-size") and not self.option("max-age"):
+            message = "max-size or max-age option is mandatory"
+            raise ValueError(message)
+        max_size = (
+            parse_quantity(self.option("max-size"), SIZE_UNITS, "size")
+            if self.option("max-size")
+            else None
+        )
+        max_age = (
+            parse_quantity(self.option("max-age"), AGE_UNITS, "age")
+            if self.option("max-age")
+            else None
+        )
+        count, size = prune(
+            platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir,
+            max_size=max_size,
+            max_age=max_age,
+        )
+        self.line(
+            f"Remove <comment>{count}</> entries (<comment>{human_size(size)}</>)"
+        )
+        return 0
+
+
+class CacheWarmCommand(Command):  # type: ignore[misc]
+    """
+    CacheWarmCommand.
+    """
+
+    name = "cache warm"
+    description = "Render whole sets of icons in the cache"
+    options = (
+        prefixes_opt,
+        colors_opt,
+        sizes_opt,
+        jobs_opt,
+        image_format_opt,
+        dpi_opt,
+        em_size_opt,
+        quality_opt,
+        png_compress_level_opt,
+        png_palette_opt,
+        png_optimize_opt,
+        folder_opt,
+    )
+    help = (
+        "Warming the cache renders in advance every icon of the chosen sets "
+        "in the chosen colors and sizes, so that the documents never wait for "
+        "an icon. The resolution, the quality and the PNG encoding must be "
+        "those of the documents. "
+        "The folder option allows filling a read-only cache folder, for example "
+        "when building a container image."
+    )
+
+    # pylint: disable=too-many-locals
+    def handle(self) -> int:
+        """
+        Handle cache warm command.
+
+        Returns
+        -------
+        int
+            status code
+
+        Raises
+        ------
+        ValueError
+            If an error occurs.
+        """
+        folder = (
+            self.option("folder")
+            or platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir
+        )
+        colors = [
+            color.strip().lower()
+            for color in self.option("colors").split(",")
+            if color.strip()
+        ]
+        # pylint: disable=import-outside-toplevel
+        import PIL.ImageColor
+
+        for color in colors:
+            PIL.ImageColor.getrgb(color)
+        image_format = self.option("image-format")
+        if image_format not in ("png", "pdf"):
+            message = f"'{image_format}' is not a correct image format"
+            raise ValueError(message)
+        jobs = int(self.option("jobs") or os.cpu_count() or 1)
+        quality = self.option("quality")
+        if quality not in QUALITIES:
+            message = f"'{quality}' is not a correct quality"
+            raise ValueError(message)
+        encoding = (
+            int(self.option("png-compress-level")),
+            int(self.option("png-palette")),
+            bool(self.option("png-optimize")),
+        )
+        if not 0 <= encoding[0] <= 9 or encoding[1] not in (0, *range(2, 257)):
+            message = f"'{encoding}' is not a correct PNG encoding"
+            raise ValueError(message)
+        resolutions = sorted(
+            {
+                pixel_size(
+                    size,
+                    float(self.option("dpi")),
+                    float(self.option("em-size")),
+                )
+                for size in self.option("size") or ["18"]
+            }
+        )
+
+        icons = load_icons(folder)
+        prefixes = self.option("prefix")
+        for prefix in prefixes:
+            if prefix not in (definition["prefix"] for definition in icons.definitions):
+                message = f"Unexisting prefix '{prefix}'"
+                raise ValueError(message)
+        tasks = plan_icon_sets(
+            icons,
+            prefixes,
+            colors,
+            image_format,
+            resolutions,
+            quality,
+            folder,
+            encoding,
+        )
+        total = sum(len(task[5]) for task in tasks)
+        if not total:
+            self.line("All the images are already in the cache")
+            return 0
+        self.line(
+            f"Render <comment>{total}</> images with <comment>{jobs}</> processes"
+        )
+
+        progress_bar = self.progress_bar(total)
+        start = time.perf_counter()
+        progress_bar.start()
+        render_all(
+            tasks,
+            image_format,
+            quality,
+            folder,
+            jobs,
+            progress_bar.advance,
+            encoding,
+        )
+        progress_bar.finish()
+        elapsed = time.perf_counter() - start
+        self.line("")
+        self.line(
+            f"Render <comment>{total}</> images in <comment>{elapsed:.1f}s</> "
+            f"(<comment>{total / elapsed:.1f}</> icons/s)"
+        )
+        return 0
+
+
+class CacheClearCommand(Command):  # type: ignore[misc]
+    """
+    CacheClearCommand.
+    """
+
+    name = "cache clear"
+    description = "Clear the cache"
+
+    def handle(self) -> int:
+        """
+        Handle cache clear command.
+
+        Returns
+        -------
+        int
+            status code
+        """
+        count, size = clear(platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir)
+        self.line(f"Remove <comment>{count}</> files (<comment>{human_size(size)}</>)")
+        return 0
+
+
 class PandocLaTeXFilterCommand(Command):  # type: ignore[misc]
     """
     PandocLaTeXFilterCommand.
@@ -524,6 +908,21 @@ def app() -> None:
     application.add(IconsAddCommand())
     application.add(IconsDeleteCommand())
     application.add(IconsListCommand())
+    application.add(CacheStatsCommand())
+    application.add(CachePruneCommand())
+    application.add(CacheWarmCommand())
+    application.add(CacheClearCommand())
     application.add(PandocLaTeXFilterCommand())
     application.add(PandocBeamerFilterCommand())
+    # pandoc runs the filter with the output format as only argument and
+    # sets PANDOC_VERSION in its environment. The formats which are neither
+    # a command nor a group of commands are passed through by the filter.
+    if (
+        "PANDOC_VERSION" in os.environ
+        and len(sys.argv) == 2
+        and not application.has(sys.argv[1])
+        and sys.argv[1] not in application.get_namespaces()
+    ):
+        main()
+        return
     application.run()
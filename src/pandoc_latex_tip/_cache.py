@@ -0,0 +1,505 @@
+"""
+Cross-process safe cache entries.
+
+The cache folder may be shared by many filter processes running at the
+same time. Each entry is written to a temporary file which is atomically
+renamed, so that a reader never sees a partial file, and is produced by a
+single process holding a lock file, so that an entry is never rendered
+twice concurrently.
+
+The entries are content-addressed: their names are digests of everything
+their content depends on, so that they never have to be invalidated.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import operator
+import os
+import pathlib
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+
+# A lock older than this number of seconds is considered as stale
+STALE_LOCK = 60.0
+
+# Delay in seconds between two attempts to acquire a lock
+LOCK_POLL = 0.05
+
+# Files of the cache folder which are not entries
+INDEX_FILE = "icons.json"
+COLORS_FILE = "colors.json"
+STATS_LOG = "stats.log"
+
+# Number of runs kept in the statistics when they grow too large
+MAX_RUNS = 1000
+
+# Size in bytes above which the statistics are truncated
+MAX_STATS_SIZE = 64 * 1024
+
+# Units of the sizes and of the ages
+SIZE_UNITS = {"": 1, "b": 1, "k": 2**10, "m": 2**20, "g": 2**30}
+AGE_UNITS = {"": 86400, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+@contextlib.contextmanager
+def atomic_write(target: pathlib.Path) -> Iterator[pathlib.Path]:
+    """
+    Write a file atomically.
+
+    The context yields a temporary path in the directory of the target,
+    with the same suffix, which replaces the target when the context exits
+    without error.
+
+    Parameters
+    ----------
+    target
+        The file path
+
+    Yields
+    ------
+    pathlib.Path
+        The temporary path to write.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp = tempfile.mkstemp(
+        dir=target.parent,
+        prefix=f".{target.stem}-",
+        suffix=target.suffix,
+    )
+    os.close(descriptor)
+    try:
+        yield pathlib.Path(temp)
+        pathlib.Path(temp).replace(target)
+    finally:
+        with contextlib.suppress(OSError):
+            pathlib.Path(temp).unlink(missing_ok=True)
+
+
+def is_stale(lock: pathlib.Path) -> bool:
+    """
+    Decide if a lock file has been abandoned.
+
+    A lock is stale when it is older than ``STALE_LOCK`` seconds or, on
+    POSIX systems, when the process which created it does not exist anymore.
+
+    Parameters
+    ----------
+    lock
+        The lock file path
+
+    Returns
+    -------
+    bool
+        True if the lock can be removed.
+    """
+    try:
+        if time.time() - lock.stat().st_mtime > STALE_LOCK:
+            return True
+        owner = int(lock.read_text(encoding="ascii") or "0")
+    except (OSError, ValueError):
+        return False
+    if os.name != "posix" or owner <= 0:
+        return False
+    try:
+        os.kill(owner, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+@contextlib.contextmanager
+def entry_lock(target: pathlib.Path) -> Iterator[None]:
+    """
+    Hold the lock of a cache entry.
+
+    The lock is a ``.lock`` file created exclusively next to the entry. The
+    context waits for the lock to be released, or to become stale.
+
+    Parameters
+    ----------
+    target
+        The file path of the entry
+
+    Yields
+    ------
+    None
+        When the lock is held.
+    """
+    lock = target.with_name(target.name + ".lock")
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        try:
+            descriptor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if is_stale(lock):
+                with contextlib.suppress(FileNotFoundError):
+                    lock.unlink()
+            else:
+                time.sleep(LOCK_POLL)
+            continue
+        break
+    try:
+        os.write(descriptor, str(os.getpid()).encode("ascii"))
+        os.close(descriptor)
+        yield
+    finally:
+        with contextlib.suppress(OSError):
+            lock.unlink()
+
+
+def single_flight(target: pathlib.Path, produce: Callable[[], None]) -> bool:
+    """
+    Produce a cache entry unless it already exists.
+
+    Only one process produces the entry, the other ones wait for it. The
+    producer is expected to write the entry with ``atomic_write``.
+
+    Parameters
+    ----------
+    target
+        The file path of the entry
+    produce
+        The function writing the entry
+
+    Returns
+    -------
+    bool
+        True if the entry has been produced by this call.
+    """
+    if target.is_file():
+        return False
+    with entry_lock(target):
+        if target.is_file():
+            return False
+        produce()
+    return True
+
+
+def content_key(*parts: str | int) -> str:
+    """
+    Compute the content-addressed key of a cache entry.
+
+    Parameters
+    ----------
+    *parts
+        Everything the content of the entry depends on
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 digest of the parts.
+    """
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def entry_path(folder: str | pathlib.Path, key: str, suffix: str) -> pathlib.Path:
+    """
+    Get the path of a content-addressed cache entry.
+
+    The entries are spread in sub-folders named by the first two characters
+    of their key.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+    key
+        The entry key
+    suffix
+        The file suffix
+
+    Returns
+    -------
+    pathlib.Path
+        The entry path.
+    """
+    return pathlib.Path(folder, key[:2], key + suffix)
+
+
+def installed_folder() -> pathlib.Path:
+    """
+    Get the read-only cache folder of the installation.
+
+    The folder is kept outside the collection folder, so that it is not
+    listed or deleted as a collection.
+
+    Returns
+    -------
+    pathlib.Path
+        The folder path.
+    """
+    return pathlib.Path(sys.prefix, "var", "cache", "pandoc_latex_tip")
+
+
+def read_only_folders(cache_path: str) -> list[str]:
+    """
+    Get the read-only cache folders.
+
+    The read-only folders are searched, in order, before the user cache
+    folder. They are given by a list of folders separated by
+    ``os.pathsep``, followed by the cache folder of the installation,
+    which can be filled when building an image or a container.
+
+    Parameters
+    ----------
+    cache_path
+        The list of folders
+
+    Returns
+    -------
+    list[str]
+        The existing read-only folders.
+    """
+    folders = [folder for folder in cache_path.split(os.pathsep) if folder]
+    folders.append(str(installed_folder()))
+    return [folder for folder in folders if pathlib.Path(folder).is_dir()]
+
+
+def touch_entry(target: str | pathlib.Path) -> None:
+    """
+    Mark a cache entry as used.
+
+    The modification time of the entries is their last use time, so that
+    the least recently used entries can be pruned first.
+
+    Parameters
+    ----------
+    target
+        The file path of the entry
+    """
+    with contextlib.suppress(OSError):
+        os.utime(target)
+
+
+def record_run(folder: str | pathlib.Path, hits: int, misses: int) -> None:
+    """
+    Record the cache hits and misses of a run.
+
+    A line is appended to the ``stats.log`` file of the cache folder. When
+    the file exceeds ``MAX_STATS_SIZE`` bytes, only the last ``MAX_RUNS``
+    runs are kept.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+    hits
+        The number of images found in the cache
+    misses
+        The number of images rendered
+    """
+    with contextlib.suppress(OSError):
+        descriptor = os.open(
+            pathlib.Path(folder, STATS_LOG),
+            os.O_CREAT | os.O_APPEND | os.O_WRONLY,
+            0o644,
+        )
+        try:
+            os.write(descriptor, f"{int(time.time())} {hits} {misses}\n".encode())
+            size = os.fstat(descriptor).st_size
+        finally:
+            os.close(descriptor)
+        if size > MAX_STATS_SIZE:
+            stats = pathlib.Path(folder, STATS_LOG)
+            lines = stats.read_text(encoding="ascii").splitlines(keepends=True)
+            with atomic_write(stats) as temporary:
+                temporary.write_text("".join(lines[-MAX_RUNS:]), encoding="ascii")
+
+
+def read_runs(
+    folder: str | pathlib.Path,
+    count: int = 100,
+) -> list[tuple[int, int, int]]:
+    """
+    Read the most recent runs recorded in the cache folder.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+    count
+        The maximum number of runs
+
+    Returns
+    -------
+    list[tuple[int, int, int]]
+        The time, hits and misses of the runs.
+    """
+    try:
+        lines = pathlib.Path(folder, STATS_LOG).read_text(encoding="ascii").splitlines()
+    except OSError:
+        return []
+    runs = []
+    for line in lines[-count:]:
+        with contextlib.suppress(ValueError):
+            timestamp, hits, misses = (int(value) for value in line.split())
+            runs.append((timestamp, hits, misses))
+    return runs
+
+
+def list_entries(folder: str | pathlib.Path) -> list[tuple[pathlib.Path, int, float]]:
+    """
+    List the entries of the cache folder.
+
+    The icon index, the color names, the statistics and the lock files are
+    not entries.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+
+    Returns
+    -------
+    list[tuple[pathlib.Path, int, float]]
+        The path, the size and the last use time of the entries.
+    """
+    entries = []
+    for filename in pathlib.Path(folder).rglob("*"):
+        if (
+            filename.name in (INDEX_FILE, COLORS_FILE, STATS_LOG)
+            or filename.suffix == ".lock"
+        ):
+            continue
+        with contextlib.suppress(OSError):
+            stat = filename.stat()
+            if filename.is_file():
+                entries.append((filename, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def remove_entries(
+    entries: list[tuple[pathlib.Path, int, float]],
+) -> tuple[int, int]:
+    """
+    Remove cache entries.
+
+    Parameters
+    ----------
+    entries
+        The entries
+
+    Returns
+    -------
+    tuple[int, int]
+        The number and the total size of the removed entries.
+    """
+    count = size = 0
+    for filename, entry_size, _ in entries:
+        with contextlib.suppress(FileNotFoundError):
+            filename.unlink()
+            count += 1
+            size += entry_size
+    return count, size
+
+
+def prune(
+    folder: str | pathlib.Path,
+    max_size: int | None = None,
+    max_age: float | None = None,
+) -> tuple[int, int]:
+    """
+    Prune the cache folder.
+
+    The entries not used for more than the maximum age are removed, then
+    the least recently used entries are removed until the cache does not
+    exceed the maximum size. The folders of the removed entries are removed
+    when they end up empty.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+    max_size
+        The maximum size in bytes (None for no limit)
+    max_age
+        The maximum age in seconds (None for no limit)
+
+    Returns
+    -------
+    tuple[int, int]
+        The number and the total size of the removed entries.
+    """
+    entries = sorted(list_entries(folder), key=operator.itemgetter(2))
+    count = 0
+    if max_age is not None:
+        limit = time.time() - max_age
+        while count < len(entries) and entries[count][2] < limit:
+            count += 1
+    if max_size is not None:
+        total = sum(entry[1] for entry in entries[count:])
+        while count < len(entries) and total > max_size:
+            total -= entries[count][1]
+            count += 1
+    result = remove_entries(entries[:count])
+    for directory in {entry[0].parent for entry in entries[:count]}:
+        with contextlib.suppress(OSError):
+            directory.rmdir()
+    return result
+
+
+def clear(folder: str | pathlib.Path) -> tuple[int, int]:
+    """
+    Clear the cache folder.
+
+    Everything is removed, including the icon index and the statistics.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+
+    Returns
+    -------
+    tuple[int, int]
+        The number and the total size of the removed files.
+    """
+    files = []
+    for filename in pathlib.Path(folder).rglob("*"):
+        # The temporary and lock files of a running filter may disappear
+        with contextlib.suppress(OSError):
+            if filename.is_file():
+                files.append((filename, filename.stat().st_size, 0.0))
+    count, size = remove_entries(files)
+    for directory in sorted(pathlib.Path(folder).rglob("*"), reverse=True):
+        with contextlib.suppress(OSError):
+            directory.rmdir()
+    return count, size
+
+
+def parse_quantity(text: str, units: dict[str, int], name: str) -> int:
+    """
+    Parse a quantity followed by an optional unit.
+
+    Parameters
+    ----------
+    text
+        The quantity
+    units
+        The units and their values (the empty unit is the default one)
+    name
+        The quantity name (for error messages)
+
+    Returns
+    -------
+    int
+        The quantity expressed in the smallest unit.
+
+    Raises
+    ------
+    ValueError
+        If the quantity is not correct.
+    """
+    match = re.fullmatch("(?P<number>\\d+(\\.\\d*)?)\\s*(?P<unit>[a-zA-Z]*)", text)
+    if match is None or match.group("unit").lower() not in units:
+        message = f"'{text}' is not a correct {name}"
+        raise ValueError(message)
+    return int(float(match.group("number")) * units[match.group("unit").lower()])
@@ -0,0 +1,94 @@
+"""
+Color names.
+
+The icon colors are X11 color names, as known by Pillow. The names and
+their values are kept in the cache folder, so that Pillow is only imported
+by the runs which render images.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import pathlib
+
+from ._cache import COLORS_FILE, atomic_write  # noqa: TID252
+
+# Values of the color names, loaded once per process
+COLORS: dict[str, str] = {}
+
+
+def pillow_hex(color: str) -> str:
+    """
+    Get the hexadecimal value of a color using Pillow.
+
+    Parameters
+    ----------
+    color
+        color name or hex value
+
+    Returns
+    -------
+    str
+        The ``#rrggbb`` value of the color.
+    """
+    # pylint: disable=import-outside-toplevel
+    import PIL.ImageColor
+
+    return "#" + bytes(PIL.ImageColor.getrgb(color)[:3]).hex()
+
+
+def load_colors(folder: str | None = None) -> dict[str, str]:
+    """
+    Load the color names.
+
+    The names are read from the ``colors.json`` file of the cache folder,
+    which is written from the Pillow color map when it does not exist.
+
+    Parameters
+    ----------
+    folder
+        The cache folder (None to use Pillow)
+
+    Returns
+    -------
+    dict[str, str]
+        The ``#rrggbb`` values of the color names.
+    """
+    if not COLORS:
+        with contextlib.suppress(OSError, TypeError, ValueError):
+            COLORS.update(
+                json.loads(
+                    pathlib.Path(str(folder), COLORS_FILE).read_text(encoding="utf-8")
+                )
+            )
+    if not COLORS:
+        # pylint: disable=import-outside-toplevel
+        import PIL.ImageColor
+
+        COLORS.update({name: pillow_hex(name) for name in PIL.ImageColor.colormap})
+        if folder is not None:
+            with (
+                contextlib.suppress(OSError),
+                atomic_write(pathlib.Path(folder, COLORS_FILE)) as temporary,
+            ):
+                temporary.write_text(json.dumps(COLORS), encoding="utf-8")
+    return COLORS
+
+
+def color_hex(color: str) -> str:
+    """
+    Get the hexadecimal value of a color.
+
+    Parameters
+    ----------
+    color
+        color name or hex value
+
+    Returns
+    -------
+    str
+        The ``#rrggbb`` value of the color.
+    """
+    value = COLORS.get(color.lower())
+    return value if value is not None else pillow_hex(color)
@@ -0,0 +1,73 @@
+"""
+Metadata definitions.
+
+The definitions are indexed by class, so that an element only checks the
+definitions it can match instead of all of them, in the order of the
+metadata block.
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+from collections.abc import Iterator
+from typing import Any
+
+
+def index_definitions(definitions: list[dict[str, Any]]) -> dict[str, list[int]]:
+    """
+    Index the definitions by class.
+
+    Each definition is indexed by its rarest class among the definitions: an
+    element can only match the definitions indexed by one of its classes.
+
+    Parameters
+    ----------
+    definitions
+        The definitions
+
+    Returns
+    -------
+    dict[str, list[int]]
+        The positions of the definitions, by class.
+    """
+    counts = collections.Counter(
+        name for definition in definitions for name in definition["classes"]
+    )
+    index: dict[str, list[int]] = {}
+    for position, definition in enumerate(definitions):
+        rarest = min(sorted(definition["classes"]), key=counts.__getitem__)
+        index.setdefault(rarest, []).append(position)
+    return index
+
+
+def match_definitions(
+    definitions: list[dict[str, Any]],
+    index: dict[str, list[int]],
+    classes: set[str],
+) -> Iterator[int]:
+    """
+    Find the definitions matched by the classes of an element.
+
+    Parameters
+    ----------
+    definitions
+        The definitions
+    index
+        The positions of the definitions, by class
+    classes
+        The classes of the element
+
+    Yields
+    ------
+    int
+        The positions of the matched definitions, in order.
+    """
+    candidates = [index[name] for name in classes if name in index]
+    if len(candidates) == 1:
+        positions = candidates[0]
+    else:
+        positions = sorted(itertools.chain.from_iterable(candidates))
+    for position in positions:
+        if classes >= definitions[position]["classes"]:
+            yield position
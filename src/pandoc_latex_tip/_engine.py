@@ -0,0 +1,211 @@
+"""
+Filter engine working on the pandoc JSON.
+
+panflute converts the whole document into Python elements and back, while
+only a tiny fraction of the elements are decorated. This engine walks the
+blocks of the JSON document, where the elements are ``{"t": ..., "c": ...}``
+dictionaries, and injects the ``RawInline`` and ``RawBlock`` elements
+directly. Only the metadata is converted into panflute elements, so that
+the options, the definitions and the header includes are handled as by
+the panflute engine.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+from panflute import Doc, debug
+from panflute.elements import from_json
+
+from ._main import element_code, finalize, prepare, tip  # noqa: TID252
+from ._walk import Candidate, walk_candidates  # noqa: TID252
+
+# Elements which cannot hold a candidate element
+SKIPPED = frozenset(
+    (
+        "Str",
+        "Space",
+        "SoftBreak",
+        "LineBreak",
+        "Math",
+        "RawInline",
+        "RawBlock",
+        "HorizontalRule",
+    )
+)
+
+# Elements on which the action is called
+CANDIDATES = frozenset(("Span", "Div", "Code", "CodeBlock"))
+
+# First blocks of a Div before which the latex code is inserted as a block
+BEFORE_BLOCKS = frozenset(
+    ("HorizontalRule", "Figure", "RawBlock", "DefinitionList", "CodeBlock")
+)
+
+# An action returns the elements replacing its element, or None to keep it
+JsonAction = Callable[[dict[str, Any]], "list[dict[str, Any]] | None"]
+
+
+def load_head(source: dict[str, Any], output_format: str) -> Doc:
+    """
+    Build a panflute document with the metadata of a JSON document.
+
+    Parameters
+    ----------
+    source
+        The JSON document
+    output_format
+        The output format
+
+    Returns
+    -------
+    Doc
+        The document, without any block.
+    """
+    head = json.loads(
+        json.dumps(
+            {
+                "pandoc-api-version": source["pandoc-api-version"],
+                "meta": source["meta"],
+                "blocks": [],
+            }
+        ),
+        object_hook=from_json,
+    )
+    head.format = output_format
+    return head
+
+
+def walk_json(items: list[Any], action: JsonAction) -> None:
+    """
+    Apply an action to the candidate elements held by a JSON list.
+
+    The children of an element are visited before the element itself and
+    the elements returned by the action replace it in the list, once the
+    whole list has been visited.
+
+    Parameters
+    ----------
+    items
+        The JSON list
+    action
+        The function called with the candidate elements
+    """
+    replacements = []
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            kind = item.get("t")
+            if kind in SKIPPED:
+                continue
+            for value in item.values():
+                if isinstance(value, list):
+                    walk_json(value, action)
+            if kind in CANDIDATES:
+                replacement = action(item)
+                if replacement is not None:
+                    replacements.append((index, replacement))
+        elif isinstance(item, list):
+            walk_json(item, action)
+    for index, replacement in reversed(replacements):
+        items[index : index + 1] = replacement
+
+
+def json_candidate(node: dict[str, Any]) -> Candidate:
+    """
+    Get the attributes and the classes of a JSON element.
+
+    Parameters
+    ----------
+    node
+        The JSON element
+
+    Returns
+    -------
+    Candidate
+        The attributes and the classes.
+    """
+    _, classes, attributes = node["c"][0]
+    return dict(attributes), classes
+
+
+def add_json_latex(node: dict[str, Any], latex: str) -> list[dict[str, Any]] | None:
+    """
+    Add latex code to a JSON element.
+
+    Parameters
+    ----------
+    node
+        Current JSON element
+    latex
+        Latex code
+
+    Returns
+    -------
+    list[dict[str, Any]] | None
+        The additional elements if any.
+    """
+    if not latex:
+        return None
+    raw_inline = {"t": "RawInline", "c": ["tex", latex]}
+    raw_block = {"t": "RawBlock", "c": ["tex", latex]}
+    if node["t"] in ("Span", "Code"):
+        return [node, raw_inline]
+    if node["t"] == "CodeBlock":
+        return [raw_block, node]
+    blocks = node["c"][1]
+    while blocks and blocks[0]["t"] == "Div":
+        blocks = blocks[0]["c"][1]
+    if not blocks or blocks[0]["t"] in BEFORE_BLOCKS:
+        blocks.insert(0, raw_block)
+    elif blocks[0]["t"] in ("Plain", "Para"):
+        blocks[0]["c"].insert(1, raw_inline)
+    elif blocks[0]["t"] == "LineBlock":
+        blocks[0]["c"][0].insert(1, raw_inline)
+    elif blocks[0]["t"] == "BulletList":
+        blocks[0]["c"][0][0]["c"].insert(1, raw_inline)
+    elif blocks[0]["t"] == "OrderedList":
+        blocks[0]["c"][1][0][0]["c"].insert(1, raw_inline)
+    else:
+        debug("[WARNING] pandoc-latex-tip: Bad usage")
+    return None
+
+
+def filter_json(source: dict[str, Any], head: Doc) -> dict[str, Any]:
+    """
+    Transform a JSON document.
+
+    The blocks of the JSON document are transformed in place.
+
+    Parameters
+    ----------
+    source
+        The JSON document
+    head
+        The document holding its metadata (see ``load_head``)
+
+    Returns
+    -------
+    dict[str, Any]
+        The transformed document, whose metadata are panflute elements.
+    """
+    candidates: list[Candidate] = []
+    walk_candidates(
+        head,
+        lambda elem, _doc: candidates.append((elem.attributes, elem.classes)),
+        head,
+    )
+    walk_json(source["blocks"], lambda node: candidates.append(json_candidate(node)))
+
+    prepare(head, candidates)
+    walk_candidates(head, tip, head)
+    walk_json(
+        source["blocks"],
+        lambda node: add_json_latex(node, element_code(head, *json_candidate(node))),
+    )
+    finalize(head)
+
+    output: dict[str, Any] = head.to_json()
+    output["blocks"] = source["blocks"]
+    return output
@@ -0,0 +1,214 @@
+"""
+Process-wide cache of CSS and TTF files.
+
+Each file is read and parsed at most once per process. The cache entries are
+keyed by the resolved path, the size and the modification time of the files
+so that a modified file is read again.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import io
+import mmap
+import pathlib
+import re
+from typing import Any
+
+FileKey = tuple[str, int, int]
+
+
+def file_key(filename: pathlib.Path) -> FileKey:
+    """
+    Get the cache key of a file.
+
+    Parameters
+    ----------
+    filename
+        The file path
+
+    Returns
+    -------
+    FileKey
+        The resolved path, the size and the modification time of the file.
+    """
+    resolved = filename.resolve()
+    stat = resolved.stat()
+    return str(resolved), stat.st_size, stat.st_mtime_ns
+
+
+@functools.cache
+def _data(key: FileKey) -> bytes | mmap.mmap:
+    with pathlib.Path(key[0]).open("rb") as stream:
+        if key[1] == 0:
+            return b""
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@functools.cache
+def _bytes(key: FileKey) -> bytes:
+    return bytes(_data(key))
+
+
+@functools.cache
+def _digest(key: FileKey) -> str:
+    return hashlib.sha256(_data(key)).hexdigest()
+
+
+@functools.cache
+def _rules(key: FileKey) -> tuple[tuple[str, str], ...]:
+    # pylint: disable=import-outside-toplevel
+    import tinycss2
+
+    with pathlib.Path(key[0]).open(encoding="utf-8") as stream:
+        rules = tinycss2.parse_stylesheet(stream.read())
+    prelude_regex = re.compile("\\.([^:]*):?:before,?")
+    content_regex = re.compile("\\s*content:\\s*([^;]+);")
+
+    result = []
+    for rule in rules:
+        if rule.type == "qualified-rule":
+            prelude = tinycss2.serialize(rule.prelude)
+            content = tinycss2.serialize(rule.content)
+            prelude_result = prelude_regex.match(prelude)
+            content_result = content_regex.match(content)
+            if prelude_result and content_result:
+                result.append((prelude_result.group(1), content_result.group(1)[1:-1]))
+    return tuple(result)
+
+
+@functools.cache
+def _font(key: FileKey) -> Any:
+    # pylint: disable=import-outside-toplevel
+    import fontTools.ttLib
+
+    return fontTools.ttLib.TTFont(key[0], lazy=True)
+
+
+@functools.lru_cache(maxsize=64)
+def _truetype(key: FileKey, size: int) -> Any:
+    # pylint: disable=import-outside-toplevel
+    import PIL.ImageFont
+
+    # The fonts of all sizes share the same content
+    return PIL.ImageFont.truetype(io.BytesIO(_bytes(key)), size)
+
+
+@functools.cache
+def _coverage(key: FileKey) -> frozenset[int]:
+    return frozenset().union(
+        *(table.cmap for table in _font(key)["cmap"].tables if table.isUnicode())
+    )
+
+
+def get_data(filename: pathlib.Path) -> bytes | mmap.mmap:
+    """
+    Get the content of a file.
+
+    Parameters
+    ----------
+    filename
+        The file path
+
+    Returns
+    -------
+    bytes | mmap.mmap
+        A read-only memory map of the file.
+    """
+    return _data(file_key(filename))
+
+
+def get_digest(filename: pathlib.Path) -> str:
+    """
+    Get the SHA-256 digest of a file.
+
+    Parameters
+    ----------
+    filename
+        The file path
+
+    Returns
+    -------
+    str
+        The hexadecimal digest.
+    """
+    return _digest(file_key(filename))
+
+
+def get_rules(css_file: pathlib.Path) -> tuple[tuple[str, str], ...]:
+    """
+    Get the icon rules of a CSS file.
+
+    Parameters
+    ----------
+    css_file
+        path to icon font CSS file
+
+    Returns
+    -------
+    tuple[tuple[str, str], ...]
+        The icon names and characters, in the order of the CSS file.
+    """
+    return _rules(file_key(css_file))
+
+
+def get_font(ttf_file: pathlib.Path) -> Any:
+    """
+    Get the fontTools font of a TTF file.
+
+    The tables are decompiled lazily, when they are first accessed.
+
+    Parameters
+    ----------
+    ttf_file
+        path to icon font TTF file
+
+    Returns
+    -------
+    Any
+        The fontTools font.
+    """
+    return _font(file_key(ttf_file))
+
+
+def get_truetype(ttf_file: pathlib.Path, size: int) -> Any:
+    """
+    Get the Pillow font of a TTF file for a font size.
+
+    The most recently used fonts are kept in a pool so that bulk rendering
+    never loads a font twice for the same size. The fonts of a file share a
+    single copy of its content.
+
+    Parameters
+    ----------
+    ttf_file
+        path to icon font TTF file
+    size
+        the font size in pixels
+
+    Returns
+    -------
+    Any
+        The Pillow FreeType font.
+    """
+    return _truetype(file_key(ttf_file), size)
+
+
+def get_coverage(ttf_file: pathlib.Path) -> frozenset[int]:
+    """
+    Get the Unicode code points covered by a font.
+
+    Only the cmap table is decompiled.
+
+    Parameters
+    ----------
+    ttf_file
+        path to icon font TTF file
+
+    Returns
+    -------
+    frozenset[int]
+        The code points found in the Unicode cmap subtables.
+    """
+    return _coverage(file_key(ttf_file))
@@ -0,0 +1,723 @@
+"""
+Icon fonts.
+"""
+
+from __future__ import annotations
+
+import operator
+import pathlib
+import sys
+from collections.abc import Iterator, Mapping
+from os import path
+from typing import TYPE_CHECKING
+
+from ._cache import (  # noqa: TID252
+    INDEX_FILE,
+    atomic_write,
+    content_key,
+    entry_path,
+    single_flight,
+)
+from ._files import (  # noqa: TID252
+    get_coverage,
+    get_digest,
+    get_font,
+    get_rules,
+    get_truetype,
+)
+from ._index import IconIndex  # noqa: TID252
+
+if TYPE_CHECKING:
+    import PIL.Image
+
+# Version of the rendering code, part of the cache keys: it must be
+# increased each time a change modifies the rendered images
+RENDERER_VERSION = 2
+
+# Resize filter and minimum render size (in pixels) of the quality presets
+QUALITIES = {
+    "fast": ("BILINEAR", 64),
+    "balanced": ("LANCZOS", 150),
+    "best": ("LANCZOS", 512),
+}
+
+# Encoding of the PNG images: compression level (0 to 9), number of levels
+# of transparency of the palette (0 for no palette) and optimization
+PngEncoding = tuple[int, int, bool]
+DEFAULT_ENCODING: PngEncoding = (6, 0, False)
+
+
+class IconFont:
+    """
+    Base class that represents web icon font.
+
+    This class has been greatly inspired by the code found
+    in https://github.com/Pythonity/icon-font-to-png
+
+    Arguments
+    ---------
+    css_file
+        path to icon font CSS file
+    ttf_file
+        path to icon font TTF file
+    prefix
+        new prefix if any
+    css_icons
+        icons already known for these files (from the icon index)
+    """
+
+    def __init__(
+        self,
+        css_file: pathlib.Path,
+        ttf_file: pathlib.Path,
+        prefix: str | None = None,
+        css_icons: dict[str, str] | None = None,
+    ) -> None:
+        self.css_file = css_file
+        self.ttf_file = ttf_file
+        self.css_icons = self.load_css(prefix) if css_icons is None else css_icons
+        self.masks: dict[tuple[int, str], PIL.Image.Image] = {}
+
+    def load_css(self, prefix: str | None) -> dict[str, str]:
+        """
+        Create a dict of all icons available in CSS file.
+
+        Arguments
+        ---------
+        prefix
+            new prefix if any
+
+        Returns
+        -------
+        dict[str, str]
+            sorted icons dict
+        """
+        coverage = get_coverage(self.ttf_file)
+        icons = {
+            name: character
+            for name, character in get_rules(self.css_file)
+            if ord(character) in coverage
+        }
+
+        common = path.commonprefix(list(icons))
+
+        # Remove common prefix
+        if prefix:
+            icons = {
+                prefix + name[len(common) :]: value for name, value in icons.items()
+            }
+
+        return dict(sorted(icons.items(), key=operator.itemgetter(0)))
+
+    def fit_size(self, icon: str, size: int) -> int:
+        """
+        Compute the largest font size for which an icon fits in a square.
+
+        The size is computed from the advance width and the bounding box of
+        the glyph.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        size
+            square size in pixels
+
+        Returns
+        -------
+        int
+            The font size in pixels.
+        """
+        font = get_font(self.ttf_file)
+        units = font["head"].unitsPerEm
+        glyph_name = font.getBestCmap().get(ord(self.css_icons[icon]))
+        if glyph_name is None:
+            return size
+        extent = font["hmtx"][glyph_name][0]
+        if "glyf" in font:
+            glyph = font["glyf"][glyph_name]
+            if glyph.numberOfContours:
+                extent = max(extent, glyph.xMax - glyph.xMin)
+        if extent <= units:
+            return size
+        return max(1, int(size * units // extent))
+
+    # pylint: disable=too-many-locals
+    def render_mask(
+        self,
+        icon: str,
+        size: int,
+        scale: float | str = "auto",
+        quality: str = "balanced",
+    ) -> PIL.Image.Image:
+        """
+        Render the coverage mask of given icon.
+
+        If the desired icon size is less than the supersampling floor of the
+        quality preset (150x150 pixels by default), we will first create an
+        image of the floor size and then scale it down, so that it's much
+        less likely that the edges of the icon end up cropped.
+
+        The glyph is rasterized once into an 8-bit coverage mask which is
+        cropped to its bounding box and centered in the output mask.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        size
+            icon size in pixels
+        scale
+            scaling factor between 0 and 1, or 'auto' for automatic scaling
+        quality
+            quality preset (fast, balanced or best)
+
+        Returns
+        -------
+        PIL.Image.Image
+            The 8-bit mask.
+        """
+        # pylint: disable=import-outside-toplevel
+        import PIL.Image
+        import PIL.ImageDraw
+
+        resample, floor = QUALITIES[quality]
+        org_size = size
+        size = max(floor, size)
+
+        scale_factor = 1.0 if scale == "auto" else float(scale)
+
+        font_size = int(size * scale_factor)
+        height = font_size  # always, as long as single-line of text
+
+        # If auto-scaling is enabled, the font size is directly computed from
+        # the glyph metrics so that the resulting graphic fits inside the
+        # boundary.
+        if scale == "auto":
+            font_size = self.fit_size(icon, size)
+        font = get_truetype(self.ttf_file, font_size)
+        width = font.getlength(self.css_icons[icon])
+
+        # The hinted advance width may be off by a pixel or two
+        while scale == "auto" and width > size and font_size > 1:
+            font_size -= 1
+            font = get_truetype(self.ttf_file, font_size)
+            width = font.getlength(self.css_icons[icon])
+
+        # Draw the icon coverage mask on an image limited to the glyph box
+        origin = ((size - width) / 2, (size - height) / 2)
+        left, top, right, bottom = font.getbbox(self.css_icons[icon], anchor="lt")
+        box = (
+            max(0, int(origin[0]) + left),
+            max(0, int(origin[1]) + top),
+            min(size, int(origin[0]) + right + 1),
+            min(size, int(origin[1]) + bottom + 1),
+        )
+        mask = PIL.Image.new("L", (max(1, box[2] - box[0]), max(1, box[3] - box[1])))
+        PIL.ImageDraw.Draw(mask).text(
+            (origin[0] - box[0], origin[1] - box[1]),
+            self.css_icons[icon],
+            font=font,
+            fill=255,
+            anchor="lt",
+        )
+
+        # Create output mask
+        out_mask = PIL.Image.new("L", (size, size))
+
+        # Crop the mask to its bounding box and center it
+        bbox = mask.getbbox()
+        if bbox:
+            mask = mask.crop(bbox)
+            out_mask.paste(
+                mask,
+                (int((size - mask.width) / 2), int((size - mask.height) / 2)),
+            )
+
+        # If necessary, scale the mask to the target size
+        if org_size != size:
+            return out_mask.resize((org_size, org_size), PIL.Image.Resampling[resample])
+        return out_mask
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def get_mask(
+        self,
+        icon: str,
+        size: int,
+        scale: float | str = "auto",
+        mask_dir: str | None = None,
+        quality: str = "balanced",
+    ) -> PIL.Image.Image:
+        """
+        Get the coverage mask of given icon.
+
+        The masks do not depend on the color. They are kept in memory and,
+        if a mask directory is given, on disk under a digest of the font,
+        the code point of the glyph, the size and the quality so that they
+        can be shared by every color and every icon name of the same glyph.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        size
+            icon size in pixels
+        scale
+            scaling factor between 0 and 1, or 'auto' for automatic scaling
+        mask_dir
+            path to mask directory (None to disable the disk cache)
+        quality
+            quality preset (fast, balanced or best)
+
+        Returns
+        -------
+        PIL.Image.Image
+            The 8-bit mask.
+        """
+        resolution = (
+            f"{size}/{quality}" if scale == "auto" else f"{size}x{scale}/{quality}"
+        )
+        key = (ord(self.css_icons[icon]), resolution)
+        if key not in self.masks:
+            if mask_dir is None:
+                self.masks[key] = self.render_mask(icon, size, scale, quality)
+            else:
+                mask_file = entry_path(
+                    mask_dir,
+                    content_key(
+                        RENDERER_VERSION,
+                        "mask",
+                        get_digest(self.ttf_file),
+                        key[0],
+                        resolution,
+                    ),
+                    ".png",
+                )
+
+                def produce() -> None:
+                    self.masks[key] = self.render_mask(icon, size, scale, quality)
+                    with atomic_write(mask_file) as temporary:
+                        self.masks[key].save(temporary)
+
+                # The mask may have been rendered by another process
+                if not single_flight(mask_file, produce):
+                    # pylint: disable=import-outside-toplevel
+                    import PIL.Image
+
+                    with PIL.Image.open(mask_file) as image:
+                        self.masks[key] = image.convert("L")
+        return self.masks[key]
+
+    def render_icon(
+        self,
+        icon: str,
+        size: int,
+        color: str = "black",
+        scale: float | str = "auto",
+        quality: str = "balanced",
+    ) -> PIL.Image.Image:
+        """
+        Render given icon with provided parameters.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        size
+            icon size in pixels
+        color
+            color name or hex value
+        scale
+            scaling factor between 0 and 1, or 'auto' for automatic scaling
+        quality
+            quality preset (fast, balanced or best)
+
+        Returns
+        -------
+        PIL.Image.Image
+            The RGBA image.
+        """
+        return tint(self.render_mask(icon, size, scale, quality), color)
+
+    def export_icon(
+        self,
+        icon: str,
+        size: int,
+        color: str = "black",
+        scale: float | str = "auto",
+        filename: str | None = None,
+        export_dir: str = "exported",
+        mask_dir: str | None = None,
+        quality: str = "balanced",
+        encoding: PngEncoding = DEFAULT_ENCODING,
+    ) -> None:
+        """
+        Export given icon with provided parameters.
+
+        The image is a tint of the coverage mask of the icon, which is only
+        rendered if it is not already cached.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        size
+            icon size in pixels
+        color
+            color name or hex value
+        scale
+            scaling factor between 0 and 1, or 'auto' for automatic scaling
+        filename
+            name of the output file
+        export_dir
+            path to export directory
+        mask_dir
+            path to mask directory (None to disable the disk cache)
+        quality
+            quality preset (fast, balanced or best)
+        encoding
+            PNG compression level, palette and optimization
+        """
+        mask = self.get_mask(icon, size, scale, mask_dir, quality)
+
+        # Make sure export directory exists
+        pathlib.Path(export_dir).mkdir(parents=True, exist_ok=True)
+
+        # Default filename
+        if not filename:
+            filename = icon + ".png"
+
+        # Save file
+        with atomic_write(pathlib.Path(export_dir, filename)) as temporary:
+            save_png(mask, color, temporary, encoding)
+
+    def pdf_page(self, icon: str, color: str = "black") -> tuple[float, bytes]:
+        """
+        Draw given icon on a PDF page.
+
+        The glyph outline is drawn directly, without any rasterization, so
+        the image scales without quality loss.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        color
+            color name or hex value
+
+        Returns
+        -------
+        tuple[float, bytes]
+            The page size and the page content stream.
+        """
+        # pylint: disable=import-outside-toplevel
+        import PIL.ImageColor
+
+        from ._pdf import glyph_page  # noqa: TID252
+
+        return glyph_page(
+            get_font(self.ttf_file),
+            self.css_icons[icon],
+            PIL.ImageColor.getrgb(color),
+        )
+
+    def export_pdf(
+        self,
+        icon: str,
+        color: str = "black",
+        filename: str | None = None,
+        export_dir: str = "exported",
+    ) -> None:
+        """
+        Export given icon as a vector PDF image.
+
+        Parameters
+        ----------
+        icon
+            valid icon name
+        color
+            color name or hex value
+        filename
+            name of the output file
+        export_dir
+            path to export directory
+        """
+        # pylint: disable=import-outside-toplevel
+        from ._pdf import write_pdf  # noqa: TID252
+
+        page = self.pdf_page(icon, color)
+
+        # Default filename
+        if not filename:
+            filename = icon + ".pdf"
+
+        # Save file
+        with atomic_write(pathlib.Path(export_dir, filename)) as temporary:
+            temporary.write_bytes(write_pdf([page]))
+
+
+def tint(mask: PIL.Image.Image, color: str) -> PIL.Image.Image:
+    """
+    Colourize a coverage mask.
+
+    Parameters
+    ----------
+    mask
+        The 8-bit mask
+    color
+        color name or hex value
+
+    Returns
+    -------
+    PIL.Image.Image
+        The RGBA image of the color with the mask as alpha channel.
+    """
+    # pylint: disable=import-outside-toplevel
+    import PIL.Image
+    import PIL.ImageColor
+
+    image = PIL.Image.new("RGBA", mask.size, PIL.ImageColor.getrgb(color)[:3])
+    image.putalpha(mask)
+    return image
+
+
+def save_png(
+    mask: PIL.Image.Image,
+    color: str,
+    filename: str | pathlib.Path,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> None:
+    """
+    Save a colourized coverage mask as a PNG image.
+
+    Without palette, the image is the RGBA tint of the mask. With a palette
+    of n levels, the mask is quantized to n levels of transparency of the
+    color: the image has one channel of at most 8 bits instead of four, and
+    only 1, 2 or 4 bits for 2, 4 or 16 levels.
+
+    The image is written without any metadata chunk.
+
+    Parameters
+    ----------
+    mask
+        The 8-bit mask
+    color
+        color name or hex value
+    filename
+        The file path
+    encoding
+        The compression level, palette levels and optimization
+    """
+    # pylint: disable=import-outside-toplevel
+    import PIL.ImageColor
+
+    compress_level, levels, optimize = encoding
+    if levels >= 2:
+        image = mask.point([round(alpha * (levels - 1) / 255) for alpha in range(256)])
+        image.putpalette(bytes(PIL.ImageColor.getrgb(color)[:3]) * levels)
+        image.save(
+            filename,
+            "PNG",
+            compress_level=compress_level,
+            optimize=optimize,
+            transparency=bytes(
+                round(level * 255 / (levels - 1)) for level in range(levels)
+            ),
+        )
+    else:
+        tint(mask, color).save(
+            filename,
+            "PNG",
+            compress_level=compress_level,
+            optimize=optimize,
+        )
+
+
+def get_core_icons() -> list[dict[str, str]]:
+    """
+    Get the core icons.
+
+    Returns
+    -------
+    list[dict[str, str]]
+        The core icons.
+    """
+    return [
+        {
+            "collection": "fontawesome",
+            "CSS": "fontawesome.css",
+            "TTF": "fa-solid-900.ttf",
+            "prefix": "fa-",
+        },
+        {
+            "collection": "fontawesome",
+            "CSS": "fontawesome.css",
+            "TTF": "fa-regular-400.ttf",
+            "prefix": "far-",
+        },
+        {
+            "collection": "fontawesome",
+            "CSS": "brands.css",
+            "TTF": "fa-brands-400.ttf",
+            "prefix": "fab-",
+        },
+    ]
+
+
+def read_config(config_path: pathlib.Path) -> list[dict[str, str]]:
+    """
+    Read the additional sets of icons from the config file.
+
+    Parameters
+    ----------
+    config_path
+        The config file path
+
+    Returns
+    -------
+    list[dict[str, str]]
+        The well formed definitions.
+    """
+    definitions = []
+    if config_path.exists():
+        # pylint: disable=import-outside-toplevel
+        import yaml
+
+        with config_path.open(encoding="utf-8") as stream:
+            config = yaml.safe_load(stream)
+            for definition in config:
+                if "collection" not in definition:
+                    break
+                if "CSS" not in definition:
+                    break
+                if "TTF" not in definition:
+                    break
+                if "prefix" not in definition:
+                    break
+                definitions.append(
+                    {
+                        "collection": definition["collection"],
+                        "CSS": definition["CSS"],
+                        "TTF": definition["TTF"],
+                        "prefix": definition["prefix"],
+                    }
+                )
+    return definitions
+
+
+class IconRegistry(Mapping[str, IconFont]):
+    """
+    Lazy registry of icons.
+
+    The registry maps icon names to IconFont. A set of icons is only loaded
+    the first time one of the names beginning with its prefix is requested.
+    The loaded sets are identified by their collection, files and prefix,
+    since several sets may share the same prefix.
+
+    Arguments
+    ---------
+    definitions
+        the sets of icons
+    index
+        the icon index
+    """
+
+    def __init__(self, definitions: list[dict[str, str]], index: IconIndex) -> None:
+        self.definitions = definitions
+        self.index = index
+        self.fonts: dict[tuple[str, str, str, str], IconFont] = {}
+
+    def icon_font(self, definition: dict[str, str]) -> IconFont:
+        """
+        Get the IconFont of a set of icons, loading it if necessary.
+
+        Parameters
+        ----------
+        definition
+            The set of icons
+
+        Returns
+        -------
+        IconFont
+            The icon font.
+        """
+        prefix = definition["prefix"]
+        key = (definition["collection"], definition["CSS"], definition["TTF"], prefix)
+        if key not in self.fonts:
+            share = pathlib.Path(sys.prefix, "share", "pandoc_latex_tip")
+            css_file = pathlib.Path(share, definition["collection"], definition["CSS"])
+            ttf_file = pathlib.Path(share, definition["collection"], definition["TTF"])
+            css_icons = self.index.lookup(css_file, ttf_file, prefix)
+            self.fonts[key] = IconFont(
+                css_file=css_file,
+                ttf_file=ttf_file,
+                prefix=prefix,
+                css_icons=css_icons,
+            )
+            if css_icons is None:
+                self.index.store(
+                    css_file,
+                    ttf_file,
+                    prefix,
+                    self.fonts[key].css_icons,
+                )
+            self.index.save()
+        return self.fonts[key]
+
+    def __getitem__(self, name: str) -> IconFont:
+        # Later sets of icons take precedence
+        for definition in reversed(self.definitions):
+            if name.startswith(definition["prefix"]):
+                icon_font = self.icon_font(definition)
+                if name in icon_font.css_icons:
+                    return icon_font
+        raise KeyError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.all())
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+    def all(self) -> dict[str, IconFont]:
+        """
+        Load all the sets of icons.
+
+        Returns
+        -------
+        dict[str, IconFont]
+            A dictionnary from icon name to IconFont.
+        """
+        icons = {}
+        for definition in self.definitions:
+            icon_font = self.icon_font(definition)
+            icons.update({key: icon_font for key in icon_font.css_icons})
+        return icons
+
+
+def load_icons(folder: str | None = None) -> IconRegistry:
+    """
+    Get the icons.
+
+    The icons found in the CSS and TTF files are stored in an index
+    located in the cache folder so that subsequent runs do not have to
+    parse these files again.
+
+    Parameters
+    ----------
+    folder
+        The cache folder (None to disable the icon index)
+
+    Returns
+    -------
+    IconRegistry
+        A lazy mapping from icon name to IconFont.
+    """
+    config_path = pathlib.Path(sys.prefix, "share", "pandoc_latex_tip", "config.yml")
+    index = IconIndex(pathlib.Path(folder, INDEX_FILE) if folder else None)
+    definitions = get_core_icons() + index.definitions(
+        config_path,
+        lambda: read_config(config_path),
+    )
+    index.save()
+    return IconRegistry(definitions, index)
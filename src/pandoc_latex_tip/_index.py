@@ -0,0 +1,249 @@
+"""
+Persistent icon index.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import pathlib
+import tempfile
+from collections.abc import Callable
+from typing import Any
+
+from ._files import get_digest  # noqa: TID252
+
+INDEX_VERSION = 2
+
+
+def set_key(css_file: pathlib.Path, ttf_file: pathlib.Path, prefix: str) -> str:
+    """
+    Get the key of a set of icons in the index.
+
+    Parameters
+    ----------
+    css_file
+        path to icon font CSS file
+    ttf_file
+        path to icon font TTF file
+    prefix
+        the icon prefix
+
+    Returns
+    -------
+    str
+        The key, several sets of icons may share the same prefix.
+    """
+    return json.dumps([str(css_file), str(ttf_file), prefix])
+
+
+def fingerprint(filename: pathlib.Path) -> dict[str, Any] | None:
+    """
+    Compute the fingerprint of a file.
+
+    Parameters
+    ----------
+    filename
+        The file path
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The size, modification time and SHA-256 digest of the file, or None
+        if the file does not exist.
+    """
+    try:
+        stat = filename.stat()
+        digest = get_digest(filename)
+    except OSError:
+        return None
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "sha256": digest,
+    }
+
+
+class IconIndex:
+    """
+    On-disk index of the icons provided by each set of icons.
+
+    The index maps each set of icons, identified by its files and its
+    prefix, to the icon names and characters found in its CSS and TTF files.
+    An entry is valid as long as the size and the modification time of the
+    files are unchanged. When only the modification time differs, the
+    SHA-256 digest is used to decide.
+
+    Arguments
+    ---------
+    filename
+        path to the index file (None for a memory-only index)
+    """
+
+    def __init__(self, filename: pathlib.Path | None) -> None:
+        self.filename = filename
+        self.dirty = False
+        self.data: dict[str, Any] = {"version": INDEX_VERSION, "sets": {}}
+        if filename is not None:
+            with contextlib.suppress(OSError, ValueError):
+                with filename.open(encoding="utf-8") as stream:
+                    data = json.load(stream)
+                if isinstance(data, dict) and data.get("version") == INDEX_VERSION:
+                    self.data = data
+
+    def fresh(self, filename: pathlib.Path, known: dict[str, Any] | None) -> bool:
+        """
+        Verify that a file still matches its known fingerprint.
+
+        Parameters
+        ----------
+        filename
+            The file path
+        known
+            The fingerprint recorded in the index
+
+        Returns
+        -------
+        bool
+            True if the file has not changed.
+        """
+        try:
+            stat = filename.stat()
+        except OSError:
+            return known is None
+        if known is None or stat.st_size != known["size"]:
+            return False
+        if stat.st_mtime_ns == known["mtime"]:
+            return True
+        current = fingerprint(filename)
+        if current is None or current["sha256"] != known["sha256"]:
+            return False
+        # Same content, only touched: remember the new modification time
+        known["mtime"] = current["mtime"]
+        self.dirty = True
+        return True
+
+    def definitions(
+        self,
+        config_path: pathlib.Path,
+        loader: Callable[[], list[Any]],
+    ) -> list[dict[str, str]]:
+        """
+        Get the additional sets of icons declared in the config file.
+
+        Parameters
+        ----------
+        config_path
+            The config file path
+        loader
+            Function reading the config file
+
+        Returns
+        -------
+        list[dict[str, str]]
+            The definitions of the additional sets of icons.
+        """
+        config = self.data.get("config")
+        if config is not None and self.fresh(config_path, config["file"]):
+            return list(config["definitions"])
+        definitions = loader()
+        self.data["config"] = {
+            "file": fingerprint(config_path),
+            "definitions": definitions,
+        }
+        self.dirty = True
+        return definitions
+
+    def lookup(
+        self,
+        css_file: pathlib.Path,
+        ttf_file: pathlib.Path,
+        prefix: str,
+    ) -> dict[str, str] | None:
+        """
+        Get the icons of a set of icons if they are still valid.
+
+        Parameters
+        ----------
+        css_file
+            path to icon font CSS file
+        ttf_file
+            path to icon font TTF file
+        prefix
+            the icon prefix
+
+        Returns
+        -------
+        dict[str, str] | None
+            The icons (name to character) or None if the entry is missing
+            or outdated.
+        """
+        entry = self.data["sets"].get(set_key(css_file, ttf_file, prefix))
+        if (
+            entry is None
+            or not self.fresh(css_file, entry["files"]["CSS"])
+            or not self.fresh(ttf_file, entry["files"]["TTF"])
+        ):
+            return None
+        return dict(entry["icons"])
+
+    def store(
+        self,
+        css_file: pathlib.Path,
+        ttf_file: pathlib.Path,
+        prefix: str,
+        icons: dict[str, str],
+    ) -> None:
+        """
+        Store the icons of a set of icons.
+
+        Parameters
+        ----------
+        css_file
+            path to icon font CSS file
+        ttf_file
+            path to icon font TTF file
+        prefix
+            the icon prefix
+        icons
+            The icons (name to character)
+        """
+        self.data["sets"][set_key(css_file, ttf_file, prefix)] = {
+            "CSS": str(css_file),
+            "TTF": str(ttf_file),
+            "files": {
+                "CSS": fingerprint(css_file),
+                "TTF": fingerprint(ttf_file),
+            },
+            "icons": icons,
+        }
+        self.dirty = True
+
+    def save(self) -> None:
+        """
+        Write the index to disk if it has changed.
+
+        The file is written atomically so that concurrent runs never read a
+        partial index. Failures are ignored since the index is only a cache.
+        """
+        if self.filename is None or not self.dirty:
+            return
+        try:
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            descriptor, temp = tempfile.mkstemp(
+                dir=self.filename.parent,
+                prefix=".icons-",
+                suffix=".tmp",
+            )
+        except OSError:
+            return
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as stream:
+                json.dump(self.data, stream)
+            pathlib.Path(temp).replace(self.filename)
+        except OSError:
+            with contextlib.suppress(OSError):
+                pathlib.Path(temp).unlink()
+            return
+        self.dirty = False
@@ -0,0 +1,390 @@
+"""
+LaTeX code for icon images.
+
+These functions produce the same LaTeX code as the pandoc LaTeX writer
+(as of pandoc 3.6) for the Image and Link elements created by the filter,
+without starting a pandoc process.
+"""
+
+from __future__ import annotations
+
+import decimal
+import os
+import re
+import urllib.parse
+
+from panflute import debug, run_pandoc
+
+# First version of pandoc whose LaTeX writer output is reproduced
+NATIVE_VERSION = (3, 6)
+
+# URI schemes recognized by pandoc that are the most likely to be used
+SCHEMES = frozenset(
+    (
+        "data",
+        "doi",
+        "file",
+        "ftp",
+        "ftps",
+        "gopher",
+        "http",
+        "https",
+        "irc",
+        "ircs",
+        "isbn",
+        "mailto",
+        "news",
+        "nntp",
+        "s3",
+        "sftp",
+        "ssh",
+        "tel",
+        "urn",
+    )
+)
+
+# Characters escaped by the pandoc LaTeX writer in URLs
+URL_ESCAPES = {
+    "\\": "/",
+    "#": "\\#",
+    "%": "\\%",
+    "{": "\\%7B",
+    "}": "\\%7D",
+    "|": "\\%7C",
+    "[": "\\%5B",
+    "]": "\\%5D",
+    "`": "\\%60",
+    "^": "\\%5E",
+}
+
+# Characters percent-encoded by pandoc in links
+URI_UNSAFE = frozenset('<>|"{}[]^`')
+
+LENGTH_REGEX = re.compile("^(?P<number>[\\d.]*)(?P<unit>.*)$")
+SCHEME_REGEX = re.compile("^(?P<scheme>[A-Za-z][A-Za-z0-9+.\\-]*):")
+
+# Header includes added to the documents
+HEADER_INCLUDES = (
+    "\\usepackage{graphicx,grffile}",
+    "\\usepackage{marginnote}",
+    "\\usepackage{etoolbox}",
+    "\\usepackage[strict]{changepage}",
+    r"""
+\makeatletter%
+\newcommand{\PandocLatexTipOddInner}{\reversemarginpar}%
+\newcommand{\PandocLatexTipEvenInner}{\reversemarginpar}%
+\newcommand{\PandocLatexTipOddOuter}{\normalmarginpar}%
+\newcommand{\PandocLatexTipEvenOuter}{\normalmarginpar}%
+\newcommand{\PandocLatexTipOddLeft}{\reversemarginpar}%
+\newcommand{\PandocLatexTipOddRight}{\normalmarginpar}%
+\if@twoside%
+\newcommand{\PandocLatexTipEvenRight}{\reversemarginpar}%
+\newcommand{\PandocLatexTipEvenLeft}{\normalmarginpar}%
+\else%
+\newcommand{\PandocLatexTipEvenRight}{\normalmarginpar}%
+\newcommand{\PandocLatexTipEvenLeft}{\reversemarginpar}%
+\fi%
+\makeatother%
+\checkoddpage%
+    """,
+)
+
+
+def native_supported() -> bool:
+    """
+    Decide if the native LaTeX code matches the pandoc LaTeX writer.
+
+    The version of pandoc is given by the ``PANDOC_VERSION`` environment
+    variable when pandoc runs the filter, otherwise pandoc is asked for it.
+
+    Returns
+    -------
+    bool
+        True if the version of pandoc is at least NATIVE_VERSION.
+    """
+    text = os.environ.get("PANDOC_VERSION")
+    if text is None:
+        text = run_pandoc(args=["--version"]).split()[1]
+    version = tuple(int(part) for part in re.findall("\\d+", text))
+    return version >= NATIVE_VERSION
+
+
+def show_float(number: float) -> str:
+    """
+    Format a number like pandoc.
+
+    Parameters
+    ----------
+    number
+        The number
+
+    Returns
+    -------
+    str
+        The number rounded to 5 decimals without trailing zeros.
+    """
+    return (
+        str(
+            decimal.Decimal(repr(number)).quantize(
+                decimal.Decimal("0.00001"),
+                rounding=decimal.ROUND_HALF_EVEN,
+            )
+        )
+        .rstrip("0")
+        .removesuffix(".")
+    )
+
+
+# pylint: disable=too-many-return-statements
+def latex_dimension(length: str) -> str | None:
+    """
+    Convert a length to a LaTeX dimension like pandoc.
+
+    Parameters
+    ----------
+    length
+        The length (number followed by an optional unit)
+
+    Returns
+    -------
+    str | None
+        The LaTeX dimension or None if pandoc does not understand it.
+    """
+    match = LENGTH_REGEX.match(length)
+    if match is None or not re.fullmatch("\\d+(\\.\\d+)?", match.group("number")):
+        return None
+    number = float(match.group("number"))
+    unit = match.group("unit")
+    if unit in ("cm", "mm", "in", "em"):
+        return show_float(number) + unit
+    if unit == "inch":
+        return show_float(number) + "in"
+    if unit == "pt":
+        return show_float(number / 72) + "in"
+    if unit == "pc":
+        return show_float(number / 6) + "in"
+    if unit in ("px", ""):
+        return show_float(int(number) / 96) + "in"
+    if unit == "%":
+        return show_float(number / 100) + "\\textheight"
+    return None
+
+
+def escape_url(url: str) -> str:
+    """
+    Escape an URL for LaTeX like pandoc.
+
+    Parameters
+    ----------
+    url
+        The URL
+
+    Returns
+    -------
+    str
+        The escaped URL.
+    """
+    return "".join(URL_ESCAPES.get(character, character) for character in url)
+
+
+def is_uri(url: str) -> bool:
+    """
+    Decide if a string is an URI with a known scheme.
+
+    Parameters
+    ----------
+    url
+        The string
+
+    Returns
+    -------
+    bool
+        True if the string starts with a known scheme.
+    """
+    match = SCHEME_REGEX.match(url)
+    return match is not None and match.group("scheme").lower() in SCHEMES
+
+
+def latex_image(url: str, height: str, page: int | None = None) -> str:
+    """
+    Get the LaTeX code of an image.
+
+    Parameters
+    ----------
+    url
+        The image path or URL
+    height
+        The image height
+    page
+        The page of a PDF image if any
+
+    Returns
+    -------
+    str
+        The LaTeX code.
+    """
+    source = escape_url(url if is_uri(url) else urllib.parse.unquote(url))
+    dimension = latex_dimension(height)
+    options = "keepaspectratio" if page is None else f"keepaspectratio,page={page}"
+    if dimension is None:
+        return f"\\pandocbounded{{\\includegraphics[{options}]{{{source}}}}}"
+    return (
+        f"\\includegraphics[width=\\linewidth,height={dimension},{options}]"
+        f"{{{source}}}"
+    )
+
+
+def latex_link(url: str, content: str) -> str:
+    """
+    Get the LaTeX code of a link.
+
+    Parameters
+    ----------
+    url
+        The link target
+    content
+        The LaTeX code of the link content
+
+    Returns
+    -------
+    str
+        The LaTeX code.
+    """
+    if url.startswith("#"):
+        label = "".join(
+            (
+                character
+                if (character.isascii() and character.isalnum())
+                or character in "_-+=:;."
+                else f"ux{ord(character):x}"
+            )
+            for character in escape_url(url[1:])
+        )
+        return f"\\hyperref[{label}]{{{content}}}"
+    target = "".join(
+        (
+            "".join(f"%{byte:02X}" for byte in character.encode())
+            if character.isspace() or character in URI_UNSAFE
+            else character
+        )
+        for character in url
+    )
+    return f"\\href{{{escape_url(target)}}}{{{content}}}"
+
+
+def latex_icon(url: str, height: str, link: str, page: int | None = None) -> str:
+    """
+    Get the LaTeX code of an icon.
+
+    Parameters
+    ----------
+    url
+        The image path or URL
+    height
+        The image height
+    link
+        The link target (empty for no link)
+    page
+        The page of a PDF image if any
+
+    Returns
+    -------
+    str
+        The LaTeX code.
+    """
+    image = latex_image(url, height, page)
+    return image if link == "" else latex_link(link, image)
+
+
+# pylint:disable=too-many-return-statements
+def get_prefix_odd(position: str) -> str:
+    """
+    Get the latex prefix.
+
+    Parameters
+    ----------
+    position
+        The icon position
+
+    Returns
+    -------
+    str
+        The latex prefix.
+    """
+    if position == "right":
+        return "\\PandocLatexTipOddRight"
+    if position in ("left", ""):
+        return "\\PandocLatexTipOddLeft"
+    if position == "inner":
+        return "\\PandocLatexTipOddInner"
+    if position == "outer":
+        return "\\PandocLatexTipOddOuter"
+    debug(
+        f"[WARNING] pandoc-latex-tip: {position}"
+        " is not a correct position; using left"
+    )
+    return "\\PandocLatexTipOddLeft"
+
+
+def get_prefix_even(position: str) -> str:
+    """
+    Get the latex prefix.
+
+    Parameters
+    ----------
+    position
+        The icon position
+
+    Returns
+    -------
+    str
+        The latex prefix.
+    """
+    if position == "right":
+        return "\\PandocLatexTipEvenRight"
+    if position in ("left", ""):
+        return "\\PandocLatexTipEvenLeft"
+    if position == "inner":
+        return "\\PandocLatexTipEvenInner"
+    if position == "outer":
+        return "\\PandocLatexTipEvenOuter"
+    debug(
+        f"[WARNING] pandoc-latex-tip: {position}"
+        " is not a correct position; using left"
+    )
+    return "\\PandocLatexTipEvenLeft"
+
+
+def get_size(size: str, warn: bool = True) -> str:
+    """
+    Get the correct size.
+
+    Parameters
+    ----------
+    size
+        The initial size
+    warn
+        Are the warnings reported?
+
+    Returns
+    -------
+    str
+        The correct size.
+    """
+    regex = re.compile("^(?P<length>\\d+(\\.\\d*)?)(pt|mm|cm|in|ex|em|mu|sp)?$")
+    if regex.match(size):
+        length = float(regex.match(size).group("length"))
+        if length <= 0:
+            if warn:
+                debug(
+                    "[WARNING] pandoc-latex-tip: size must be greater than 0; using 18"
+                )
+            return "18"
+    else:
+        if warn:
+            debug(
+                "[WARNING] pandoc-latex-tip:"
+                " size must be a correct LaTeX length; using 18"
+            )
+        return "18"
+    return size
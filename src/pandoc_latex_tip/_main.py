@@ -6,21 +6,14 @@ Pandoc filter for adding tip in LaTeX.
 
 from __future__ import annotations
 
-import operator
+import json
+import os
 import pathlib
-import re
+import shutil
 import sys
 import tempfile
-from os import path
 from typing import Any
 
-import PIL.Image
-import PIL.ImageColor
-import PIL.ImageDraw
-import PIL.ImageFont
-
-import fontTools.ttLib
-
 from panflute import (
     BulletList,
     Code,
@@ -44,374 +37,114 @@ from panflute import (
     Span,
     convert_text,
     debug,
-    run_filter,
+    run_filters,
 )
+from panflute.elements import from_json
 
 import platformdirs
 
-import tinycss2
-
-import yaml
+from ._cache import read_only_folders, record_run, touch_entry  # noqa: TID252
+from ._colors import load_colors  # noqa: TID252
+from ._definitions import index_definitions, match_definitions  # noqa: TID252
+from ._icons import QUALITIES, IconFont, load_icons  # noqa: TID252
+from ._latex import (  # noqa: TID252
+    HEADER_INCLUDES,
+    get_prefix_even,
+    get_prefix_odd,
+    get_size,
+    latex_icon,
+    native_supported,
+)
+from ._options import get_encoding, get_number, get_option  # noqa: TID252
+from ._render import (  # noqa: TID252
+    DEFAULT_DPI,
+    DEFAULT_EM_SIZE,
+    RenderTask,
+    export_bundle,
+    export_image,
+    image_key,
+    image_path,
+    pixel_size,
+    render_all,
+)
+from ._walk import Candidate, walk_candidates  # noqa: TID252
+
+# Output formats decorated by the filter
+LATEX_FORMATS = ("latex", "beamer")
+
+# Key mapping of the latex-tip-* attributes
+ATTRIBUTE_KEYS = {
+    "icon": "latex-tip-icon",
+    "image": "latex-tip-image",
+    "position": "latex-tip-position",
+    "size": "latex-tip-size",
+    "color": "latex-tip-color",
+    "link": "latex-tip-link",
+}
+
+# Key mapping of the metadata definitions
+DEFINITION_KEYS = {
+    "icon": "icons",
+    "position": "position",
+    "size": "size",
+    "color": "color",
+    "link": "link",
+}
 
 
-class IconFont:
+def tip(elem: Element, doc: Doc) -> list[Element] | None:
     """
-    Base class that represents web icon font.
-
-    This class has been greatly inspired by the code found
-    in https://github.com/Pythonity/icon-font-to-png
-
-    Arguments
-    ---------
-    css_file
-        path to icon font CSS file
-    ttf_file
-        path to icon font TTF file
-    prefix
-        new prefix if any
-    """
-
-    def __init__(
-        self,
-        css_file: pathlib.Path,
-        ttf_file: pathlib.Path,
-        prefix: str | None = None,
-    ) -> None:
-        self.css_file = css_file
-        self.ttf_file = ttf_file
-        self.css_icons = self.load_css(prefix)
-
-    def load_css(self, prefix: str | None) -> dict[str, str]:
-        """
-        Create a dict of all icons available in CSS file.
-
-        Arguments
-        ---------
-        prefix
-            new prefix if any
-
-        Returns
-        -------
-        dict[str, str]
-            sorted icons dict
-        """
-        # pylint: disable=too-many-locals
-        icons = {}
-        common = None
-        with self.css_file.open() as stream:
-            rules = tinycss2.parse_stylesheet(stream.read())
-        font = fontTools.ttLib.TTFont(self.ttf_file)
-        prelude_regex = re.compile("\\.([^:]*):?:before,?")
-        content_regex = re.compile("\\s*content:\\s*([^;]+);")
-
-        # pylint: disable=too-many-nested-blocks
-        for rule in rules:
-            if rule.type == "qualified-rule":
-                prelude = tinycss2.serialize(rule.prelude)
-                content = tinycss2.serialize(rule.content)
-                prelude_result = prelude_regex.match(prelude)
-                content_result = content_regex.match(content)
-                if prelude_result and content_result:
-                    name = prelude_result.group(1)
-                    character = content_result.group(1)[1:-1]
-                    for cmap in font["cmap"].tables:
-                        if cmap.isUnicode() and ord(character) in cmap.cmap:
-                            common = (
-                                name
-                                if common is None
-                                else path.commonprefix((common, name))  # type: ignore
-                            )
-                            icons[name] = character
-                            break
-
-        common = common or ""
-
-        # Remove common prefix
-        if prefix:
-            icons = {
-                prefix + name[len(common) :]: value for name, value in icons.items()
-            }
-
-        return dict(sorted(icons.items(), key=operator.itemgetter(0)))
-
-    # pylint: disable=too-many-arguments,too-many-locals,too-many-positional-arguments
-    def export_icon(
-        self,
-        icon: str,
-        size: int,
-        color: str = "black",
-        scale: float | str = "auto",
-        filename: str | None = None,
-        export_dir: str = "exported",
-    ) -> None:
-        """
-        Export given icon with provided parameters.
-
-        If the desired icon size is less than 150x150 pixels, we will first
-        create a 150x150 pixels image and then scale it down, so that
-        it's much less likely that the edges of the icon end up cropped.
-
-        Parameters
-        ----------
-        icon
-            valid icon name
-        size
-            icon size in pixels
-        color
-            color name or hex value
-        scale
-            scaling factor between 0 and 1, or 'auto' for automatic scaling
-        filename
-            name of the output file
-        export_dir
-            path to export directory
-        """
-        org_size = size
-        size = max(150, size)
-
-        image = PIL.Image.new("RGBA", (size, size), color=(0, 0, 0, 0))
-        draw = PIL.ImageDraw.Draw(image)
-
-        scale_factor = 1.0 if scale == "auto" else float(scale)
-
-        font_size = int(size * scale_factor)
-        font = PIL.ImageFont.truetype(self.ttf_file, font_size)
-        width = draw.textlength(self.css_icons[icon], font=font)
-        height = font_size  # always, as long as single-line of text
-
-        # If auto-scaling is enabled, we need to make sure the resulting
-        # graphic fits inside the boundary. The values are rounded and may be
-        # off by a pixel or two, so we may need to do a few iterations.
-        # The use of a decrementing multiplication factor protects us from
-        # getting into an infinite loop.
-        if scale == "auto":
-            iteration = 0
-            factor = 1.0
-
-            while True:
-                width = draw.textlength(self.css_icons[icon], font=font)
-
-                # Check if the image fits
-                dim = max(width, height)
-                if dim > size:
-                    font = PIL.ImageFont.truetype(
-                        self.ttf_file,
-                        int(size * size / dim * factor),
-                    )
-                else:
-                    break
-
-                # Adjust the factor every two iterations
-                iteration += 1
-                if iteration % 2 == 0:
-                    factor *= 0.99
-
-        draw.text(
-            ((size - width) / 2, (size - height) / 2),
-            self.css_icons[icon],
-            font=font,
-            fill=color,
-            anchor="lt",
-        )
-
-        # Get bounding box
-        bbox = image.getbbox()
-
-        # Create an alpha mask
-        image_mask = PIL.Image.new("L", (size, size))
-        draw_mask = PIL.ImageDraw.Draw(image_mask)
-
-        # Draw the icon on the mask
-        draw_mask.text(
-            ((size - width) / 2, (size - height) / 2),
-            self.css_icons[icon],
-            font=font,
-            fill=255,
-            anchor="lt",
-        )
-
-        # Create a solid color image and apply the mask
-        icon_image = PIL.Image.new("RGBA", (size, size), color)
-        icon_image.putalpha(image_mask)
-
-        if bbox:
-            icon_image = icon_image.crop(bbox)
-
-        border_w = int((size - (bbox[2] - bbox[0])) / 2)
-        border_h = int((size - (bbox[3] - bbox[1])) / 2)
-
-        # Create output image
-        out_image = PIL.Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        out_image.paste(icon_image, (border_w, border_h))
-
-        # If necessary, scale the image to the target size
-        if org_size != size:
-            out_image = out_image.resize(
-                (org_size, org_size),
-                PIL.Image.Resampling.LANCZOS,
-            )
-
-        # Make sure export directory exists
-        if not pathlib.Path(export_dir).exists():
-            pathlib.Path(export_dir).mkdir(parents=True)
-
-        # Default filename
-        if not filename:
-            filename = icon + ".png"
-
-        # Save file
-        out_image.save(path.join(export_dir, filename))
-
+    Apply tip transformation to element.
 
-def get_core_icons() -> list[dict[str, str]]:
-    """
-    Get the core icons.
+    Parameters
+    ----------
+    elem
+        The element
+    doc
+        The original document.
 
     Returns
     -------
-    list[dict[str, str]]
-        The core icons.
-    """
-    return [
-        {
-            "collection": "fontawesome",
-            "CSS": "fontawesome.css",
-            "TTF": "fa-solid-900.ttf",
-            "prefix": "fa-",
-        },
-        {
-            "collection": "fontawesome",
-            "CSS": "fontawesome.css",
-            "TTF": "fa-regular-400.ttf",
-            "prefix": "far-",
-        },
-        {
-            "collection": "fontawesome",
-            "CSS": "brands.css",
-            "TTF": "fa-brands-400.ttf",
-            "prefix": "fab-",
-        },
-    ]
-
-
-def load_icons() -> dict[str, IconFont]:
+    list[Element] | None
+        The additional elements if any.
     """
-    Get the icons.
+    # Is it a Span, Div?
+    if isinstance(elem, Span | Div | Code | CodeBlock):
+        return add_latex(elem, element_code(doc, elem.attributes, elem.classes))
 
-    Returns
-    -------
-    dict["str", IconFont]
-        A dictionnary from icon name to IconFont.
-    """
-    icons = {}
-    for definition in get_core_icons():
-        icon_font = IconFont(
-            css_file=pathlib.Path(
-                sys.prefix,
-                "share",
-                "pandoc_latex_tip",
-                definition["collection"],
-                definition["CSS"],
-            ),
-            ttf_file=pathlib.Path(
-                sys.prefix,
-                "share",
-                "pandoc_latex_tip",
-                definition["collection"],
-                definition["TTF"],
-            ),
-            prefix=definition["prefix"],
-        )
-        icons.update({key: icon_font for key in icon_font.css_icons})
-
-    config_path = pathlib.Path(sys.prefix, "share", "pandoc_latex_tip", "config.yml")
-    if config_path.exists():
-        with config_path.open(encoding="utf-8") as stream:
-            config = yaml.safe_load(stream)
-            for definition in config:
-                if "collection" not in definition:
-                    break
-                collection = definition["collection"]
-                if "CSS" not in definition:
-                    break
-                css_file = definition["CSS"]
-                if "TTF" not in definition:
-                    break
-                ttf_file = definition["TTF"]
-                if "prefix" not in definition:
-                    break
-                prefix = definition["prefix"]
-                icon_font = IconFont(
-                    css_file=pathlib.Path(
-                        sys.prefix,
-                        "share",
-                        "pandoc_latex_tip",
-                        collection,
-                        css_file,
-                    ),
-                    ttf_file=pathlib.Path(
-                        sys.prefix,
-                        "share",
-                        "pandoc_latex_tip",
-                        collection,
-                        ttf_file,
-                    ),
-                    prefix=prefix,
-                )
-                icons.update({key: icon_font for key in icon_font.css_icons})
-
-    return icons
+    return None
 
 
-def tip(elem: Element, doc: Doc) -> list[Element] | None:
+def element_code(doc: Doc, attributes: dict[str, str], classes: list[str]) -> str:
     """
-    Apply tip transformation to element.
+    Get the latex code decorating an element.
 
     Parameters
     ----------
-    elem
-        The element
     doc
-        The original document.
+        The original document
+    attributes
+        The element attributes
+    classes
+        The element classes
 
     Returns
     -------
-    list[Element] | None
-        The additional elements if any.
+    str
+        The latex code (empty if the element is not decorated).
     """
-    # Is it in the right format and is it a Span, Div?
-    if doc.format in ("latex", "beamer") and isinstance(
-        elem, Span | Div | Code | CodeBlock
-    ):
-        # Is there a latex-tip-icon attribute?
-        if "latex-tip-icon" in elem.attributes or "latex-tip-image" in elem.attributes:
-            return add_latex(
-                elem,
-                latex_code(
-                    doc,
-                    elem.attributes,
-                    {
-                        "icon": "latex-tip-icon",
-                        "image": "latex-tip-image",
-                        "position": "latex-tip-position",
-                        "size": "latex-tip-size",
-                        "color": "latex-tip-color",
-                        "link": "latex-tip-link",
-                    },
-                ),
-            )
-
-        # Get the classes
-        classes = set(elem.classes)
+    # Is there a latex-tip-icon attribute?
+    if "latex-tip-icon" in attributes or "latex-tip-image" in attributes:
+        return attribute_code(doc, attributes)
 
-        # Loop on all font size definition
-        # noinspection PyUnresolvedReferences
-        for definition in doc.defined:
-            # Are the classes correct?
-            if classes >= definition["classes"]:
-                return add_latex(elem, definition["latex"])
+    # Loop on the definitions whose classes are correct
+    # noinspection PyUnresolvedReferences
+    for position in match_definitions(doc.defined, doc.class_index, set(classes)):
+        latex = definition_code(doc, position)
+        if latex:
+            return latex
 
-    return None
+    return ""
 
 
 def add_latex(elem: Element, latex: str) -> list[Element] | None:
@@ -509,10 +242,39 @@ def latex_code(doc: Doc, definition: dict[str, Any], keys: dict[str, str]) -> st
     return ""
 
 
+def attribute_code(doc: Doc, attributes: dict[str, str]) -> str:
+    """
+    Get the latex code of the ``latex-tip-*`` attributes of an element.
+
+    The code is computed once per run for each distinct combination of
+    attributes, the elements sharing the same attributes reuse it.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    attributes
+        The element attributes
+
+    Returns
+    -------
+    str
+        The latex code.
+    """
+    key = tuple(attributes.get(name) for name in ATTRIBUTE_KEYS.values())
+    if key in doc.attribute_codes:
+        doc.attribute_hits += 1
+    else:
+        doc.attribute_misses += 1
+        doc.attribute_codes[key] = latex_code(doc, attributes, ATTRIBUTE_KEYS)
+    return str(doc.attribute_codes[key])
+
+
 def get_icons(
     doc: Doc,
     definition: dict[str, Any],
     keys: dict[str, str],
+    warn: bool = True,
 ) -> list[dict[str, Any]]:
     """
     Get tge icons.
@@ -525,6 +287,8 @@ def get_icons(
         The definition
     keys
         Key mapping
+    warn
+        Are the warnings reported?
 
     Returns
     -------
@@ -547,7 +311,7 @@ def get_icons(
                     icon["link"] = icon.get("link", link)
                     if not icon.get("image"):
                         icon["color"] = icon.get("color", color)
-                    add_icon(doc, icons, icon)
+                    add_icon(doc, icons, icon, warn)
                 else:
                     add_icon(
                         doc,
@@ -557,6 +321,7 @@ def get_icons(
                             "color": color,
                             "link": link,
                         },
+                        warn,
                     )
         elif definition[keys["icon"]] in doc.icons:
             icons = [
@@ -594,7 +359,12 @@ def get_icons(
     return icons
 
 
-def add_icon(doc: Doc, icons: list[dict[str, str]], icon: dict[str, str]) -> None:
+def add_icon(
+    doc: Doc,
+    icons: list[dict[str, str]],
+    icon: dict[str, str],
+    warn: bool = True,
+) -> None:
     """
     Add icon.
 
@@ -606,6 +376,8 @@ def add_icon(doc: Doc, icons: list[dict[str, str]], icon: dict[str, str]) -> Non
         A list of icon definition
     icon
         A potential new icon
+    warn
+        Are the warnings reported?
     """
     if "image" in icon:
         icons.append(
@@ -617,20 +389,20 @@ def add_icon(doc: Doc, icons: list[dict[str, str]], icon: dict[str, str]) -> Non
     else:
         if "name" not in icon:
             # Bad formed icon
-            debug("[WARNING] pandoc-latex-tip: Bad formed icon")
+            if warn:
+                debug("[WARNING] pandoc-latex-tip: Bad formed icon")
             return
 
         # Lower the color
         lower_color = icon["color"].lower()
 
         # Convert the color to black if unexisting
-        # pylint: disable=import-outside-toplevel
-
-        if lower_color not in PIL.ImageColor.colormap:
-            debug(
-                f"[WARNING] pandoc-latex-tip: {lower_color}"
-                " is not a correct color name; using black"
-            )
+        if lower_color not in doc.colors:
+            if warn:
+                debug(
+                    f"[WARNING] pandoc-latex-tip: {lower_color}"
+                    " is not a correct color name; using black"
+                )
             lower_color = "black"
 
         # Is the icon correct?
@@ -644,100 +416,116 @@ def add_icon(doc: Doc, icons: list[dict[str, str]], icon: dict[str, str]) -> Non
                         "link": icon["link"],
                     }
                 )
-            else:
+            elif warn:
                 debug(
                     f"[WARNING] pandoc-latex-tip: {icon['name']}"
                     " is not a correct icon name"
                 )
         except FileNotFoundError:
-            debug("[WARNING] pandoc-latex-tip: error in accessing to icons definition")
+            if warn:
+                debug(
+                    "[WARNING] pandoc-latex-tip: error in accessing to icons definition"
+                )
 
 
-# pylint:disable=too-many-return-statements
-def get_prefix_odd(position: str) -> str:
+def image_code(
+    doc: Doc,
+    url: str,
+    size: str,
+    link: str,
+    page: int | None = None,
+) -> str:
     """
-    Get the latex prefix.
+    Get the LaTeX code of an image.
+
+    The code is produced natively unless the ``pandoc`` converter has been
+    chosen, in which case pandoc is run for each image.
 
     Parameters
     ----------
-    position
-        The icon position
+    doc
+        The original document
+    url
+        The image path or URL
+    size
+        The image height
+    link
+        The link target (empty for no link)
+    page
+        The page of a PDF image if any
 
     Returns
     -------
     str
-        The latex prefix.
-    """
-    if position == "right":
-        return "\\PandocLatexTipOddRight"
-    if position in ("left", ""):
-        return "\\PandocLatexTipOddLeft"
-    if position == "inner":
-        return "\\PandocLatexTipOddInner"
-    if position == "outer":
-        return "\\PandocLatexTipOddOuter"
-    debug(
-        f"[WARNING] pandoc-latex-tip: {position}"
-        " is not a correct position; using left"
-    )
-    return "\\PandocLatexTipOddLeft"
+        The latex code.
+    """
+    if doc.converter == "pandoc":
+        attributes = {"height": size}
+        if page is not None:
+            attributes["page"] = str(page)
+        image = Image(url=url, attributes=attributes)
+        elem = image if link == "" else Link(image, url=link)
+        return str(
+            convert_text(Plain(elem), input_format="panflute", output_format="latex")
+        )
+    return latex_icon(url, size, link, page)
 
 
-def get_prefix_even(position: str) -> str:
+def get_resolution(doc: Doc, size: str) -> int:
     """
-    Get the latex prefix.
+    Get the size in pixels of an icon image.
 
     Parameters
     ----------
-    position
-        The icon position
+    doc
+        The original document
+    size
+        The icon size (a correct LaTeX length)
 
     Returns
     -------
-    str
-        The latex prefix.
-    """
-    if position == "right":
-        return "\\PandocLatexTipEvenRight"
-    if position in ("left", ""):
-        return "\\PandocLatexTipEvenLeft"
-    if position == "inner":
-        return "\\PandocLatexTipEvenInner"
-    if position == "outer":
-        return "\\PandocLatexTipEvenOuter"
-    debug(
-        f"[WARNING] pandoc-latex-tip: {position}"
-        " is not a correct position; using left"
-    )
-    return "\\PandocLatexTipEvenLeft"
+    int
+        The size in pixels.
+    """
+    return pixel_size(size, doc.dpi, doc.em_size)
 
 
-def get_size(size: str) -> str:
+def get_image_path(doc: Doc, icon: dict[str, Any], resolution: int) -> str:
     """
-    Get the correct size.
+    Get the path of an icon image in the cache folders.
+
+    The image is searched in the read-only cache folders first. If it is not
+    found, its path in the user cache folder is returned.
 
     Parameters
     ----------
-    size
-        The initial size
+    doc
+        The original document
+    icon
+        The icon definition
+    resolution
+        The size in pixels
 
     Returns
     -------
     str
-        The correct size.
-    """
-    regex = re.compile("^(?P<length>\\d+(\\.\\d*)?)(pt|mm|cm|in|ex|em|mu|sp)?$")
-    if regex.match(size):
-        length = float(regex.match(size).group("length"))
-        if length <= 0:
-            debug("[WARNING] pandoc-latex-tip: size must be greater than 0; using 18")
-            return "18"
-    else:
-        debug(
-            "[WARNING] pandoc-latex-tip: size must be a correct LaTeX length; using 18"
+        The image path.
+    """
+    icon_font = doc.icons[icon["name"]]
+    for folder in (*doc.cache_path, doc.folder):
+        image_file = image_path(
+            folder,
+            icon_font,
+            icon["name"],
+            icon["color"],
+            doc.image_format,
+            resolution,
+            doc.quality,
+            doc.encoding,
         )
-        return "18"
-    return size
+        if pathlib.Path(image_file).is_file() or folder == doc.folder:
+            break
+    return image_file
 
 
 def create_images(doc: Doc, icons: list[dict[str, Any]], size: str) -> list[str]:
@@ -767,42 +555,49 @@ def create_images(doc: Doc, icons: list[dict[str, Any]], size: str) -> list[str]
         if size.isdigit():
             size += "pt"
         if icon.get("image"):
-            image = Image(
-                url=str(icon.get("image")),
-                attributes={"height": size},
-            )
-            elem = image if icon["link"] == "" else Link(image, url=icon["link"])
-            images.append(
-                convert_text(
-                    Plain(elem), input_format="panflute", output_format="latex"
-                )
-            )
+            images.append(image_code(doc, str(icon.get("image")), size, icon["link"]))
         else:
-            image_path = path.join(doc.folder, icon["color"], icon["name"] + ".png")
-
             # Create the image if not existing in the cache
             try:
-                if not path.isfile(image_path):
+                # Use the page of the bundle if any
+                page = (
+                    doc.bundle_pages.get(
+                        image_key(
+                            doc.icons[icon["name"]], icon["name"], icon["color"], "pdf"
+                        )
+                    )
+                    if doc.bundle_pages
+                    else None
+                )
+                if page is not None:
+                    images.append(
+                        image_code(doc, doc.bundle_file, size, icon["link"], page)
+                    )
+                    continue
+
+                resolution = get_resolution(doc, size)
+                image_file = get_image_path(doc, icon, resolution)
+                if not pathlib.Path(image_file).is_file():
                     # Create the image in the cache
                     # noinspection PyUnresolvedReferences
-                    doc.icons[icon["name"]].export_icon(
+                    export_image(
+                        doc.icons[icon["name"]],
                         icon["name"],
-                        512,
-                        color=icon["color"],
-                        export_dir=path.join(doc.folder, icon["color"]),
+                        icon["color"],
+                        doc.image_format,
+                        resolution,
+                        doc.quality,
+                        doc.folder,
+                        doc.encoding,
                     )
+                    doc.rendered.add(image_file)
+                elif image_file not in doc.used and image_file not in doc.rendered:
+                    # Record the use of a cached image for the pruning
+                    touch_entry(image_file)
+                doc.used.add(image_file)
 
                 # Add the LaTeX image
-                image = Image(
-                    url=str(image_path),
-                    attributes={"height": size},
-                )
-                elem = image if icon["link"] == "" else Link(image, url=icon["link"])
-                images.append(
-                    convert_text(
-                        Plain(elem), input_format="panflute", output_format="latex"
-                    )
-                )
+                images.append(image_code(doc, image_file, size, icon["link"]))
             except TypeError:
                 debug(
                     f"[WARNING] pandoc-latex-tip: icon name "
@@ -814,52 +609,183 @@ def create_images(doc: Doc, icons: list[dict[str, Any]], size: str) -> list[str]
     return images
 
 
-def add_definition(doc: Doc, definition: dict[str, Any]) -> None:
+def definition_code(doc: Doc, position: int) -> str:
     """
-    Add definition to document.
+    Get the latex code of a definition.
+
+    The code is computed when the definition is matched for the first time.
 
     Parameters
     ----------
     doc
         The original document
-    definition
-        The definition
+    position
+        The position of the definition
+
+    Returns
+    -------
+    str
+        The latex code (empty if the definition has no correct icon).
     """
-    # Get the classes
-    classes = definition["classes"]
+    definition = doc.defined[position]
+    if definition["latex"] is None:
+        definition["latex"] = latex_code(doc, definition["definition"], DEFINITION_KEYS)
+    return str(definition["latex"])
 
-    # Add a definition if correct
-    if bool(classes):
-        latex = latex_code(
-            doc,
-            definition,
-            {
-                "icon": "icons",
-                "position": "position",
-                "size": "size",
-                "color": "color",
-                "link": "link",
-            },
+
+def collect_icons(
+    doc: Doc,
+    candidates: list[Candidate],
+) -> list[dict[str, Any]]:
+    """
+    Collect the icons used by the document.
+
+    The icons are collected from the ``latex-tip-*`` attributes of the
+    document elements and from the first definition with icons matched by
+    the classes of the other elements. The warnings are not reported here
+    but when the LaTeX code is emitted.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    candidates
+        The attributes and the classes of the elements which can be decorated
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        The icon definitions, with their size, in the order of the document.
+    """
+
+    def sized_icons(definition: dict[str, Any], keys: dict[str, str]) -> list[Any]:
+        size = get_size(str(definition.get(keys["size"], "18")), warn=False)
+        return [
+            icon | {"size": size}
+            for icon in get_icons(doc, definition, keys, warn=False)
+        ]
+
+    icons: list[dict[str, Any]] = []
+    matched: dict[int, list[Any]] = {}
+    for attributes, classes in candidates:
+        if "latex-tip-icon" in attributes or "latex-tip-image" in attributes:
+            icons.extend(sized_icons(attributes.copy(), ATTRIBUTE_KEYS))
+            continue
+        # The definitions without icons fall through to the next match
+        for position in match_definitions(doc.defined, doc.class_index, set(classes)):
+            if position not in matched:
+                matched[position] = sized_icons(
+                    doc.defined[position]["definition"], DEFINITION_KEYS
+                )
+                icons.extend(matched[position])
+            if matched[position]:
+                break
+    return [icon for icon in icons if "name" in icon]
+
+
+def plan_images(doc: Doc, icons: list[dict[str, Any]]) -> list[RenderTask]:
+    """
+    Collect the images missing from the cache.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    icons
+        The icons used by the document
+
+    Returns
+    -------
+    list[RenderTask]
+        The glyphs to render, with their missing colors.
+    """
+    colors: dict[tuple[str, int], dict[str, None]] = {}
+    for icon in icons:
+        resolution = get_resolution(doc, icon["size"])
+        image_file = get_image_path(doc, icon, resolution)
+        if not pathlib.Path(image_file).is_file():
+            colors.setdefault((icon["name"], resolution), {})[icon["color"]] = None
+            doc.rendered.add(image_file)
+
+    tasks = []
+    for (name, resolution), icon_colors in colors.items():
+        icon_font = doc.icons[name]
+        tasks.append(
+            (
+                icon_font.css_file,
+                icon_font.ttf_file,
+                name,
+                icon_font.css_icons[name],
+                resolution,
+                tuple(icon_colors),
+            )
         )
-        if latex:
-            # noinspection PyUnresolvedReferences
-            doc.defined.append({"classes": set(classes), "latex": latex})
+    return tasks
 
 
-def prepare(doc: Doc) -> None:
+def bundle_icons(doc: Doc, icons: list[dict[str, Any]]) -> None:
     """
-    Prepare the document.
+    Pack the icons used by the document into a single PDF image.
+
+    Each distinct icon and color is a page of the bundle.
 
     Parameters
     ----------
     doc
-        The original document.
+        The original document
+    icons
+        The icons used by the document
     """
-    # Add getIconFont library to doc
-    doc.icons = load_icons()
+    pages: dict[str, tuple[IconFont, str, str]] = {}
+    for icon in icons:
+        icon_font = doc.icons[icon["name"]]
+        key = image_key(icon_font, icon["name"], icon["color"], "pdf")
+        if key not in pages:
+            pages[key] = (icon_font, icon["name"], icon["color"])
+    if pages:
+        doc.bundle_file, produced = export_bundle(list(pages.values()), doc.folder)
+        (doc.rendered if produced else doc.used).add(doc.bundle_file)
+        doc.bundle_pages = {key: index + 1 for index, key in enumerate(pages)}
 
-    # Prepare the definitions
-    doc.defined = []
+
+def prepare(
+    doc: Doc,
+    candidates: list[Candidate] | None = None,
+) -> None:
+    """
+    Prepare the document.
+
+    Parameters
+    ----------
+    doc
+        The original document.
+    candidates
+        The attributes and the classes of the elements which can be decorated
+        (collected from the document if None)
+    """
+    # Prepare the cache statistics
+    doc.used = set()
+    doc.rendered = set()
+
+    # Prepare the latex code of the attributes
+    doc.attribute_codes = {}
+    doc.attribute_hits = 0
+    doc.attribute_misses = 0
+
+    # Get the LaTeX converter, the native code reproduces recent versions of
+    # pandoc only
+    doc.converter = get_option(doc, "converter", "native")
+    if doc.converter == "native" and not native_supported():
+        doc.converter = "pandoc"
+
+    # Get the image format
+    doc.image_format = get_option(doc, "image-format", "png")
+    if doc.image_format not in ("png", "pdf"):
+        debug(
+            f"[WARNING] pandoc-latex-tip: {doc.image_format}"
+            " is not a correct image format; using png"
+        )
+        doc.image_format = "png"
 
     # Prepare the folder
     try:
@@ -867,8 +793,7 @@ def prepare(doc: Doc) -> None:
         doc.folder = platformdirs.AppDirs(
             "pandoc_latex_tip",
         ).user_cache_dir
-        if not pathlib.Path(doc.folder).exists():
-            pathlib.Path(doc.folder).mkdir(parents=True)
+        pathlib.Path(doc.folder).mkdir(parents=True, exist_ok=True)
     except PermissionError:
         # Fallback to a temporary dir
         doc.folder = tempfile.mkdtemp(
@@ -876,20 +801,78 @@ def prepare(doc: Doc) -> None:
             suffix="_cache",
         )
 
+    # Get the resolution and the quality of the bitmap images
+    doc.dpi = get_number(doc, "dpi", DEFAULT_DPI)
+    doc.em_size = get_number(doc, "em-size", DEFAULT_EM_SIZE)
+    doc.quality = get_option(doc, "quality", "balanced")
+    if doc.quality not in QUALITIES:
+        debug(
+            f"[WARNING] pandoc-latex-tip: {doc.quality}"
+            " is not a correct quality; using balanced"
+        )
+        doc.quality = "balanced"
+
+    # Get the encoding of the PNG images
+    doc.encoding = get_encoding(doc)
+
+    # Get the color names
+    doc.colors = load_colors(doc.folder)
+
+    # Get the bundle mode
+    doc.bundle = get_option(doc, "bundle", "false") == "true"
+    doc.bundle_file = ""
+    doc.bundle_pages = {}
+
+    # Get the number of rendering processes
+    try:
+        doc.jobs = int(get_option(doc, "jobs", str(os.cpu_count() or 1)))
+    except ValueError:
+        debug("[WARNING] pandoc-latex-tip: jobs must be an integer; using 1")
+        doc.jobs = 1
+
+    # Get the read-only cache folders
+    doc.cache_path = read_only_folders(get_option(doc, "cache-path", "", lower=False))
+
+    # Add getIconFont library to doc
+    doc.icons = load_icons(doc.folder)
+
     # Get the meta data
     # noinspection PyUnresolvedReferences
     meta = doc.get_metadata("pandoc-latex-tip")
 
-    if isinstance(meta, list):
-        # Loop on all definitions
-        for definition in meta:
-            # Verify the definition
-            if (
-                isinstance(definition, dict)
-                and "classes" in definition
-                and isinstance(definition["classes"], list)
-            ):
-                add_definition(doc, definition)
+    # Verify the definitions, their latex code is computed on first match
+    doc.defined = [
+        {"classes": set(definition["classes"]), "definition": definition, "latex": None}
+        for definition in (meta if isinstance(meta, list) else [])
+        if isinstance(definition, dict)
+        and "classes" in definition
+        and isinstance(definition["classes"], list)
+        and definition["classes"]
+    ]
+
+    # Index the definitions by class
+    doc.class_index = index_definitions(doc.defined)
+
+    # Render the missing images before emitting any LaTeX code
+    if candidates is None:
+        candidates = []
+        walk_candidates(
+            doc,
+            lambda elem, _doc: candidates.append((elem.attributes, elem.classes)),
+            doc,
+        )
+    icons = collect_icons(doc, candidates)
+    if doc.bundle:
+        bundle_icons(doc, icons)
+    else:
+        render_all(
+            plan_images(doc, icons),
+            doc.image_format,
+            doc.quality,
+            doc.folder,
+            doc.jobs,
+            encoding=doc.encoding,
+        )
 
 
 def finalize(doc: Doc) -> None:
@@ -901,6 +884,18 @@ def finalize(doc: Doc) -> None:
     doc
         The original document
     """
+    # Record the cache statistics
+    if doc.used or doc.rendered:
+        record_run(doc.folder, len(doc.used - doc.rendered), len(doc.rendered))
+
+    # Report the statistics if asked
+    if get_option(doc, "verbose", "false") == "true":
+        debug(
+            f"[INFO] pandoc-latex-tip: attribute code {doc.attribute_hits} hits"
+            f" and {doc.attribute_misses} misses, images"
+            f" {len(doc.used - doc.rendered)} hits and {len(doc.rendered)} misses"
+        )
+
     # Add header-includes if necessary
     if "header-includes" not in doc.metadata:
         doc.metadata["header-includes"] = MetaList()
@@ -908,49 +903,37 @@ def finalize(doc: Doc) -> None:
     elif not isinstance(doc.metadata["header-includes"], MetaList):
         doc.metadata["header-includes"] = MetaList(doc.metadata["header-includes"])
 
-    doc.metadata["header-includes"].append(
-        MetaInlines(RawInline("\\usepackage{graphicx,grffile}", "tex"))
-    )
-    doc.metadata["header-includes"].append(
-        MetaInlines(RawInline("\\usepackage{marginnote}", "tex"))
-    )
-    doc.metadata["header-includes"].append(
-        MetaInlines(RawInline("\\usepackage{etoolbox}", "tex"))
-    )
-    doc.metadata["header-includes"].append(
-        MetaInlines(RawInline("\\usepackage[strict]{changepage}", "tex"))
-    )
-    doc.metadata["header-includes"].append(
-        MetaInlines(
-            RawInline(
-                r"""
-\makeatletter%
-\newcommand{\PandocLatexTipOddInner}{\reversemarginpar}%
-\newcommand{\PandocLatexTipEvenInner}{\reversemarginpar}%
-\newcommand{\PandocLatexTipOddOuter}{\normalmarginpar}%
-\newcommand{\PandocLatexTipEvenOuter}{\normalmarginpar}%
-\newcommand{\PandocLatexTipOddLeft}{\reversemarginpar}%
-\newcommand{\PandocLatexTipOddRight}{\normalmarginpar}%
-\if@twoside%
-\newcommand{\PandocLatexTipEvenRight}{\reversemarginpar}%
-\newcommand{\PandocLatexTipEvenLeft}{\normalmarginpar}%
-\else%
-\newcommand{\PandocLatexTipEvenRight}{\normalmarginpar}%
-\newcommand{\PandocLatexTipEvenLeft}{\reversemarginpar}%
-\fi%
-\makeatother%
-\checkoddpage%
-    """,
-                "tex",
-            )
-        )
-    )
+    for code in HEADER_INCLUDES:
+        doc.metadata["header-includes"].append(MetaInlines(RawInline(code, "tex")))
 
 
-def main(doc: Doc | None = None) -> Doc:
+def transform(doc: Doc) -> None:
+    """
+    Transform the document.
+
+    The tip transformation is only applied to the elements which can be
+    decorated, the other ones are not visited.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    """
+    prepare(doc)
+    walk_candidates(doc, tip, doc)
+    finalize(doc)
+
+
+def main(doc: Doc | None = None) -> Doc | None:
     """
     Transform the pandoc document.
 
+    The documents in other formats than LaTeX are passed through without
+    any work: when run by pandoc, the document is copied from the standard
+    input to the standard output without being parsed. Otherwise, the
+    ``engine`` option selects whether the document read from the standard
+    input is transformed as panflute elements or as JSON.
+
     Arguments
     ---------
     doc
@@ -958,10 +941,49 @@ def main(doc: Doc | None = None) -> Doc:
 
     Returns
     -------
-    Doc
-        The transformed document
-    """
-    return run_filter(tip, prepare=prepare, finalize=finalize, doc=doc)
+    Doc | None
+        The transformed document (None if the document is read from the
+        standard input)
+    """
+    if doc is not None:
+        if doc.format not in LATEX_FORMATS:
+            return doc
+        return run_filters([], prepare=transform, doc=doc)
+
+    # pandoc gives the output format as first argument
+    output_format = sys.argv[1] if len(sys.argv) > 1 else "html"
+    if output_format not in LATEX_FORMATS:
+        shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)
+        return None
+
+    # The JSON engine is built on this module
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from ._engine import filter_json, load_head  # noqa: TID252
+
+    text = sys.stdin.buffer.read()
+    source = json.loads(text)
+    head = load_head(source, output_format)
+    # Only one tree of the document is kept alive: the dictionaries for the
+    # JSON engine, the elements otherwise
+    if get_option(head, "engine", "panflute") == "json":
+        del text
+        output = filter_json(source, head)
+    else:
+        del source
+        output = json.loads(text, object_hook=from_json)
+        del text
+        output.format = output_format
+        run_filters([], prepare=transform, doc=output)
+    sys.stdout.buffer.write(
+        json.dumps(
+            output,
+            default=lambda elem: elem.to_json(),
+            check_circular=False,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+    )
+    return None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""
+Filter options.
+
+Each option is given in the metadata block using a
+``pandoc-latex-tip-<option>`` entry or in the environment using a
+``PANDOC_LATEX_TIP_<OPTION>`` variable.
+"""
+
+from __future__ import annotations
+
+import os
+
+from panflute import Doc, debug
+
+from ._icons import DEFAULT_ENCODING, PngEncoding  # noqa: TID252
+
+
+def get_option(doc: Doc, name: str, default: str, lower: bool = True) -> str:
+    """
+    Get a filter option.
+
+    The option is read from the ``pandoc-latex-tip-<name>`` metadata entry,
+    then from the ``PANDOC_LATEX_TIP_<NAME>`` environment variable.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    name
+        The option name
+    default
+        The default value
+    lower
+        Is the value converted to lower case?
+
+    Returns
+    -------
+    str
+        The option value.
+    """
+    value = doc.get_metadata(f"pandoc-latex-tip-{name}", None)
+    if value is None:
+        env_name = "PANDOC_LATEX_TIP_" + name.upper().replace("-", "_")
+        value = os.environ.get(env_name, default)
+    return str(value).lower() if lower else str(value)
+
+
+def get_number(doc: Doc, name: str, default: float) -> float:
+    """
+    Get a filter option which is a positive number.
+
+    Parameters
+    ----------
+    doc
+        The original document
+    name
+        The option name
+    default
+        The default value
+
+    Returns
+    -------
+    float
+        The option value.
+    """
+    try:
+        value = float(get_option(doc, name, str(default)))
+    except ValueError:
+        value = 0.0
+    if value > 0:
+        return value
+    debug(
+        f"[WARNING] pandoc-latex-tip: {name} must be a positive number;"
+        f" using {default:g}"
+    )
+    return default
+
+
+def get_encoding(doc: Doc) -> PngEncoding:
+    """
+    Get the encoding of the PNG images.
+
+    Parameters
+    ----------
+    doc
+        The original document
+
+    Returns
+    -------
+    PngEncoding
+        The compression level, palette levels and optimization.
+    """
+    compress_level, levels, optimize = DEFAULT_ENCODING
+    try:
+        compress_level = int(get_option(doc, "png-compress-level", str(compress_level)))
+        if not 0 <= compress_level <= 9:
+            compress_level = DEFAULT_ENCODING[0]
+            debug("[WARNING] pandoc-latex-tip: png-compress-level must be 0 to 9")
+    except ValueError:
+        debug("[WARNING] pandoc-latex-tip: png-compress-level must be an integer")
+    try:
+        levels = int(get_option(doc, "png-palette", str(levels)))
+        if levels not in (0, *range(2, 257)):
+            levels = DEFAULT_ENCODING[1]
+            debug("[WARNING] pandoc-latex-tip: png-palette must be 0 or 2 to 256")
+    except ValueError:
+        debug("[WARNING] pandoc-latex-tip: png-palette must be an integer")
+    optimize = get_option(doc, "png-optimize", str(optimize)) == "true"
+    return compress_level, levels, optimize
@@ -0,0 +1,174 @@
+"""
+Vector icons.
+
+The glyph outlines are drawn with a fontTools pen into tiny PDF files
+containing a single filled path.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import Any
+
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.boundsPen import BoundsPen
+
+
+def number(value: float) -> str:
+    """
+    Format a number for a PDF content stream.
+
+    Parameters
+    ----------
+    value
+        The number
+
+    Returns
+    -------
+    str
+        The number with at most 2 decimals.
+    """
+    text = f"{value:.2f}".rstrip("0").removesuffix(".")
+    return "0" if text == "-0" else text
+
+
+class PDFPathPen(BasePen):  # type: ignore[misc]
+    """
+    Pen producing PDF path construction operators.
+
+    Arguments
+    ---------
+    glyph_set
+        the glyph set of the font
+    """
+
+    def __init__(self, glyph_set: Any) -> None:
+        super().__init__(glyph_set)
+        self.operators: list[str] = []
+
+    def _moveTo(self, pt: tuple[float, float]) -> None:  # noqa: N802
+        self.operators.append(f"{number(pt[0])} {number(pt[1])} m")
+
+    def _lineTo(self, pt: tuple[float, float]) -> None:  # noqa: N802
+        self.operators.append(f"{number(pt[0])} {number(pt[1])} l")
+
+    def _curveToOne(  # noqa: N802
+        self,
+        pt1: tuple[float, float],
+        pt2: tuple[float, float],
+        pt3: tuple[float, float],
+    ) -> None:
+        self.operators.append(
+            " ".join(number(value) for value in (*pt1, *pt2, *pt3)) + " c"
+        )
+
+    def _closePath(self) -> None:  # noqa: N802
+        self.operators.append("h")
+
+
+def glyph_page(
+    font: Any,
+    character: str,
+    color: tuple[int, ...],
+) -> tuple[float, bytes]:
+    """
+    Draw a glyph centered on a square page.
+
+    The page size is the largest value between the advance width of the
+    glyph, the width and the height of its outline and the font size, so
+    that the outline is never clipped.
+
+    Parameters
+    ----------
+    font
+        The fontTools font
+    character
+        The icon character
+    color
+        The RGB color
+
+    Returns
+    -------
+    tuple[float, bytes]
+        The page size (in font units) and the page content stream.
+    """
+    glyph_set = font.getGlyphSet()
+    glyph_name = font.getBestCmap()[ord(character)]
+    glyph = glyph_set[glyph_name]
+    side = max(glyph.width, font["head"].unitsPerEm)
+
+    bounds_pen = BoundsPen(glyph_set)
+    glyph.draw(bounds_pen)
+    path_pen = PDFPathPen(glyph_set)
+    glyph.draw(path_pen)
+    if bounds_pen.bounds is not None:
+        x_min, y_min, x_max, y_max = bounds_pen.bounds
+        side = max(side, x_max - x_min, y_max - y_min)
+
+    operators = [
+        " ".join(number(value / 255) for value in color[:3]) + " rg",
+    ]
+    if bounds_pen.bounds is not None and path_pen.operators:
+        x_min, y_min, x_max, y_max = bounds_pen.bounds
+        operators.append(
+            f"1 0 0 1 {number((side - x_max - x_min) / 2)} "
+            f"{number((side - y_max - y_min) / 2)} cm"
+        )
+        operators.extend(path_pen.operators)
+        operators.append("f")
+    return side, "\n".join(operators).encode("ascii")
+
+
+def write_pdf(pages: list[tuple[float, bytes]]) -> bytes:
+    """
+    Write a PDF document.
+
+    Parameters
+    ----------
+    pages
+        The square pages, given by their size and their content stream
+
+    Returns
+    -------
+    bytes
+        The PDF document.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{3 + 2 * index} 0 R" for index in range(len(pages)))
+            + f"] /Count {len(pages)} >>"
+        ).encode("ascii"),
+    ]
+    for index, (side, content) in enumerate(pages):
+        stream = zlib.compress(content, 9)
+        objects.extend(
+            (
+                (
+                    f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {number(side)} "
+                    f"{number(side)}] /Contents {4 + 2 * index} 0 R "
+                    "/Resources << >> >>"
+                ).encode("ascii"),
+                f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode(
+                    "ascii"
+                )
+                + stream
+                + b"\nendstream",
+            )
+        )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, content in enumerate(objects):
+        offsets.append(len(output))
+        output += f"{index + 1} 0 obj\n".encode("ascii") + content + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("ascii")
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("ascii")
+    return bytes(output)
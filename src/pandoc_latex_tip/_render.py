@@ -0,0 +1,489 @@
+"""
+Rendering of the icon images.
+
+The images missing from the cache are rendered before the LaTeX code is
+emitted, concurrently in a pool of processes. The work is split by glyph
+so that the coverage mask of a glyph is rendered once for all its colors.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import pathlib
+import re
+from collections.abc import Callable
+from os import path
+
+from ._cache import (  # noqa: TID252
+    atomic_write,
+    content_key,
+    entry_path,
+    single_flight,
+)
+from ._colors import color_hex  # noqa: TID252
+from ._files import get_digest  # noqa: TID252
+from ._icons import (  # noqa: TID252
+    DEFAULT_ENCODING,
+    RENDERER_VERSION,
+    IconFont,
+    IconRegistry,
+    PngEncoding,
+)
+
+# Default resolution of the bitmap images in dots per inch
+DEFAULT_DPI = 300.0
+
+# Default size of the em unit in points
+DEFAULT_EM_SIZE = 10.0
+
+# Maximum size in pixels of the bitmap images
+MAX_IMAGE_SIZE = 2048
+
+# Length of the LaTeX units in points, or in ems for the font-relative ones
+UNIT_POINTS = {
+    "": 1.0,
+    "pt": 1.0,
+    "mm": 72.27 / 25.4,
+    "cm": 72.27 / 2.54,
+    "in": 72.27,
+    "sp": 1 / 65536,
+}
+UNIT_EMS = {"em": 1.0, "ex": 0.430554, "mu": 1 / 18}
+
+# A glyph to render: font files, icon name, icon character, size in pixels
+# and colors
+RenderTask = tuple[pathlib.Path, pathlib.Path, str, str, int, tuple[str, ...]]
+
+
+def pixel_size(length: str, dpi: float, em_size: float) -> int:
+    """
+    Get the size in pixels of an icon printed at a LaTeX length.
+
+    A length without unit is expressed in points. The ``ex`` and ``mu``
+    units are derived from the em size, as in the Computer Modern fonts.
+
+    Parameters
+    ----------
+    length
+        The LaTeX length
+    dpi
+        The resolution in dots per inch
+    em_size
+        The size of the em unit in points
+
+    Returns
+    -------
+    int
+        The size in pixels, between 1 and ``MAX_IMAGE_SIZE``.
+
+    Raises
+    ------
+    ValueError
+        If the length is not correct.
+    """
+    match = re.fullmatch("(?P<number>\\d+(\\.\\d*)?)(?P<unit>[a-z]*)", length)
+    if match is None or (
+        match.group("unit") not in UNIT_POINTS and match.group("unit") not in UNIT_EMS
+    ):
+        message = f"'{length}' is not a correct LaTeX length"
+        raise ValueError(message)
+    unit = match.group("unit")
+    if unit in UNIT_POINTS:
+        points = float(match.group("number")) * UNIT_POINTS[unit]
+    else:
+        points = float(match.group("number")) * UNIT_EMS[unit] * em_size
+    return min(MAX_IMAGE_SIZE, max(1, math.ceil(points * dpi / 72.27)))
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def image_key(
+    icon_font: IconFont,
+    name: str,
+    color: str,
+    image_format: str,
+    resolution: int = 0,
+    quality: str = "balanced",
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> str:
+    """
+    Get the key of an icon image.
+
+    The key is a digest of the font file, the code point of the glyph, the
+    color, the resolution, the quality and the encoding (for the bitmap
+    images), the image format and the renderer version.
+
+    Parameters
+    ----------
+    icon_font
+        The icon font
+    name
+        The icon name
+    color
+        The icon color
+    image_format
+        The image format (png or pdf)
+    resolution
+        The size in pixels (ignored for the vector images)
+    quality
+        The quality preset (ignored for the vector images)
+    encoding
+        The PNG encoding (ignored for the vector images)
+
+    Returns
+    -------
+    str
+        The image key.
+    """
+    return content_key(
+        RENDERER_VERSION,
+        get_digest(icon_font.ttf_file),
+        ord(icon_font.css_icons[name]),
+        color_hex(color),
+        (
+            "vector"
+            if image_format == "pdf"
+            else "/".join(str(part) for part in (resolution, quality, *encoding))
+        ),
+        image_format,
+    )
+
+
+def image_path(
+    folder: str,
+    icon_font: IconFont,
+    name: str,
+    color: str,
+    image_format: str,
+    resolution: int,
+    quality: str,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> str:
+    """
+    Get the path of an icon image in the cache folder.
+
+    The image is addressed by its key. Updating a font only invalidates the
+    glyphs it modifies.
+
+    Parameters
+    ----------
+    folder
+        The cache folder
+    icon_font
+        The icon font
+    name
+        The icon name
+    color
+        The icon color
+    image_format
+        The image format (png or pdf)
+    resolution
+        The size in pixels (ignored for the vector images)
+    quality
+        The quality preset (ignored for the vector images)
+    encoding
+        The PNG encoding (ignored for the vector images)
+
+    Returns
+    -------
+    str
+        The image path.
+    """
+    key = image_key(icon_font, name, color, image_format, resolution, quality, encoding)
+    return str(entry_path(path.join(folder, "images"), key, f".{image_format}"))
+
+
+def export_bundle(
+    icons: list[tuple[IconFont, str, str]],
+    folder: str,
+) -> tuple[str, bool]:
+    """
+    Export icons as the pages of a single PDF image.
+
+    The bundle is addressed by a digest of the keys of its pages.
+
+    Parameters
+    ----------
+    icons
+        The icon fonts, names and colors, in the order of the pages
+    folder
+        The cache folder
+
+    Returns
+    -------
+    tuple[str, bool]
+        The bundle path and True if it has been produced by this call.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ._pdf import write_pdf  # noqa: TID252
+
+    target = entry_path(
+        path.join(folder, "bundles"),
+        content_key(
+            RENDERER_VERSION,
+            *(
+                image_key(icon_font, name, color, "pdf")
+                for icon_font, name, color in icons
+            ),
+        ),
+        ".pdf",
+    )
+
+    def produce() -> None:
+        pages = [icon_font.pdf_page(name, color) for icon_font, name, color in icons]
+        with atomic_write(target) as temporary:
+            temporary.write_bytes(write_pdf(pages))
+
+    return str(target), single_flight(target, produce)
+
+
+def export_image(
+    icon_font: IconFont,
+    name: str,
+    color: str,
+    image_format: str,
+    resolution: int,
+    quality: str,
+    folder: str,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> None:
+    """
+    Export an icon image in the cache folder.
+
+    The image is produced by a single process at a time, the other ones
+    wait for it.
+
+    Parameters
+    ----------
+    icon_font
+        The icon font
+    name
+        The icon name
+    color
+        The icon color
+    image_format
+        The image format (png or pdf)
+    resolution
+        The size in pixels (ignored for the vector images)
+    quality
+        The quality preset (ignored for the vector images)
+    folder
+        The cache folder
+    encoding
+        The PNG encoding (ignored for the vector images)
+    """
+    target = pathlib.Path(
+        image_path(
+            folder,
+            icon_font,
+            name,
+            color,
+            image_format,
+            resolution,
+            quality,
+            encoding,
+        )
+    )
+
+    def produce() -> None:
+        if image_format == "pdf":
+            icon_font.export_pdf(
+                name,
+                color=color,
+                filename=target.name,
+                export_dir=str(target.parent),
+            )
+        else:
+            icon_font.export_icon(
+                name,
+                resolution,
+                color=color,
+                filename=target.name,
+                export_dir=str(target.parent),
+                mask_dir=path.join(folder, "masks"),
+                quality=quality,
+                encoding=encoding,
+            )
+
+    single_flight(target, produce)
+
+
+def render_glyph(
+    task: RenderTask,
+    image_format: str,
+    quality: str,
+    folder: str,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> None:
+    """
+    Render a glyph in all its colors.
+
+    This function is run by the worker processes.
+
+    Parameters
+    ----------
+    task
+        The glyph to render
+    image_format
+        The image format (png or pdf)
+    quality
+        The quality preset
+    folder
+        The cache folder
+    encoding
+        The PNG encoding
+    """
+    css_file, ttf_file, name, character, resolution, colors = task
+    icon_font = IconFont(css_file, ttf_file, css_icons={name: character})
+    for color in colors:
+        export_image(
+            icon_font,
+            name,
+            color,
+            image_format,
+            resolution,
+            quality,
+            folder,
+            encoding,
+        )
+
+
+def render_all(
+    tasks: list[RenderTask],
+    image_format: str,
+    quality: str,
+    folder: str,
+    jobs: int,
+    progress: Callable[[int], None] | None = None,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> None:
+    """
+    Render glyphs, concurrently if possible.
+
+    A glyph which cannot be rendered is skipped: it will be rendered again
+    when its LaTeX code is emitted, and the error will be reported there.
+
+    Parameters
+    ----------
+    tasks
+        The glyphs to render
+    image_format
+        The image format (png or pdf)
+    quality
+        The quality preset
+    folder
+        The cache folder
+    jobs
+        The maximum number of worker processes
+    progress
+        A function called with the number of images of each finished glyph
+    encoding
+        The PNG encoding
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            with contextlib.suppress(OSError, ValueError):
+                render_glyph(task, image_format, quality, folder, encoding)
+            if progress is not None:
+                progress(len(task[5]))
+        return
+
+    # pylint: disable=import-outside-toplevel
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(tasks))
+    ) as executor:
+        futures = {
+            executor.submit(
+                render_glyph, task, image_format, quality, folder, encoding
+            ): task
+            for task in tasks
+        }
+        for future in concurrent.futures.as_completed(futures):
+            with contextlib.suppress(
+                OSError, ValueError, concurrent.futures.BrokenExecutor
+            ):
+                future.result()
+            if progress is not None:
+                progress(len(futures[future][5]))
+
+
+# pylint: disable=too-many-locals
+def plan_icon_sets(
+    icons: IconRegistry,
+    prefixes: list[str],
+    colors: list[str],
+    image_format: str,
+    resolutions: list[int],
+    quality: str,
+    folder: str,
+    encoding: PngEncoding = DEFAULT_ENCODING,
+) -> list[RenderTask]:
+    """
+    Collect the images of whole sets of icons missing from the cache.
+
+    The icon names sharing the same glyph are rendered once per resolution.
+
+    Parameters
+    ----------
+    icons
+        The icon registry
+    prefixes
+        The prefixes of the sets of icons (all the sets if empty)
+    colors
+        The colors
+    image_format
+        The image format (png or pdf)
+    resolutions
+        The sizes in pixels
+    quality
+        The quality preset
+    folder
+        The cache folder
+    encoding
+        The PNG encoding
+
+    Returns
+    -------
+    list[RenderTask]
+        The glyphs to render, with their missing colors.
+    """
+    seen = set()
+    tasks = []
+    for definition in icons.definitions:
+        if prefixes and definition["prefix"] not in prefixes:
+            continue
+        icon_font = icons.icon_font(definition)
+        for name, character in icon_font.css_icons.items():
+            for resolution in resolutions:
+                missing = []
+                for color in colors:
+                    image_file = image_path(
+                        folder,
+                        icon_font,
+                        name,
+                        color,
+                        image_format,
+                        resolution,
+                        quality,
+                        encoding,
+                    )
+                    if (
+                        image_file not in seen
+                        and not pathlib.Path(image_file).is_file()
+                    ):
+                        missing.append(color)
+                    seen.add(image_file)
+                if missing:
+                    tasks.append(
+                        (
+                            icon_font.css_file,
+                            icon_font.ttf_file,
+                            name,
+                            character,
+                            resolution,
+                            tuple(missing),
+                        )
+                    )
+    return tasks
@@ -0,0 +1,117 @@
+"""
+Traversal of the candidate elements of a document.
+
+The panflute traversal calls the action on every element of the document,
+which are overwhelmingly ``Str``, ``Space`` and ``SoftBreak`` elements in
+prose. This traversal does not visit the elements which cannot hold a
+``Span``, a ``Div``, a ``Code`` or a ``CodeBlock`` and only calls the
+action on these candidate elements.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from panflute import (
+    Code,
+    CodeBlock,
+    Div,
+    Doc,
+    Element,
+    HorizontalRule,
+    LineBreak,
+    Math,
+    MetaBool,
+    MetaString,
+    RawBlock,
+    RawInline,
+    SoftBreak,
+    Space,
+    Span,
+    Str,
+)
+from panflute.containers import DictContainer, ListContainer
+
+# Elements which cannot hold a candidate element
+SKIPPED = frozenset(
+    (
+        Str,
+        Space,
+        SoftBreak,
+        LineBreak,
+        Math,
+        RawInline,
+        RawBlock,
+        HorizontalRule,
+        MetaString,
+        MetaBool,
+    )
+)
+
+# Elements on which the action is called
+CANDIDATES = frozenset((Span, Div, Code, CodeBlock))
+
+# An action returns the elements replacing its element, or None to keep it
+Action = Callable[[Element, Doc], "list[Element] | None"]
+
+# The attributes and the classes of a candidate element
+Candidate = tuple[dict[str, str], list[str]]
+
+
+def walk_candidates(elem: Element, action: Action, doc: Doc) -> None:
+    """
+    Apply an action to the candidate elements held by an element.
+
+    The elements are visited in the same order as the panflute traversal:
+    the children of an element are visited before the element itself.
+
+    Parameters
+    ----------
+    elem
+        The element
+    action
+        The function called with the candidate elements and the document
+    doc
+        The original document
+    """
+    # pylint: disable=protected-access
+    for name in elem._children:
+        child = getattr(elem, name)
+        if isinstance(child, ListContainer):
+            walk_container(child, action, doc)
+        elif isinstance(child, DictContainer):
+            for value in child.dict.values():
+                walk_candidates(value, action, doc)
+        elif child is not None:
+            walk_candidates(child, action, doc)
+
+
+def walk_container(container: ListContainer, action: Action, doc: Doc) -> None:
+    """
+    Apply an action to the candidate elements held by a list of elements.
+
+    The elements returned by the action replace the candidate element in
+    the list.
+
+    Parameters
+    ----------
+    container
+        The list of elements
+    action
+        The function called with the candidate elements and the document
+    doc
+        The original document
+    """
+    items = container.list
+    index = 0
+    while index < len(items):
+        item = items[index]
+        index += 1
+        if type(item) in SKIPPED:
+            continue
+        walk_candidates(item, action, doc)
+        if type(item) in CANDIDATES:
+            replacement = action(item, doc)
+            if replacement is not None:
+                container[index - 1 : index] = replacement
+                index += len(replacement) - 1
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from pandoc_latex_tip._cache import (
+    SIZE_UNITS,
+    atomic_write,
+    clear,
+    entry_path,
+    installed_folder,
+    list_entries,
+    parse_quantity,
+    prune,
+    read_runs,
+    read_only_folders,
+    record_run,
+    single_flight,
+    touch_entry,
+)
+
+
+def produce_entry(folder):
+    target = pathlib.Path(folder, "entry.txt")
+
+    def produce():
+        with pathlib.Path(folder, "log.txt").open("a") as log:
+            log.write(f"{os.getpid()}\n")
+        time.sleep(0.2)
+        with atomic_write(target) as temporary:
+            temporary.write_text("done")
+
+    single_flight(target, produce)
+    return target.read_text()
+
+
+class CacheTest(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def test_atomic(self):
+        target = pathlib.Path(self.folder.name, "entry.txt")
+        with self.assertRaises(ValueError):  # noqa: PT027
+            with atomic_write(target) as temporary:
+                temporary.write_text("partial")
+                raise ValueError
+        self.assertEqual(  # noqa: PT009
+            list(pathlib.Path(self.folder.name).iterdir()), []
+        )
+
+    def test_single_flight(self):
+        with multiprocessing.Pool(4) as pool:
+            results = pool.map(produce_entry, [self.folder.name] * 4)
+        self.assertEqual(results, ["done"] * 4)  # noqa: PT009
+        log = pathlib.Path(self.folder.name, "log.txt").read_text().splitlines()
+        self.assertEqual(len(log), 1)  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            sorted(path.name for path in pathlib.Path(self.folder.name).iterdir()),
+            ["entry.txt", "log.txt"],
+        )
+
+    def test_stale(self):
+        target = pathlib.Path(self.folder.name, "entry.txt")
+        lock = pathlib.Path(self.folder.name, "entry.txt.lock")
+        lock.write_text("0")
+        os.utime(lock, (time.time() - 3600, time.time() - 3600))
+        self.assertTrue(  # noqa: PT009
+            single_flight(target, lambda: target.write_text("done"))
+        )
+        self.assertFalse(lock.exists())  # noqa: PT009
+
+    def test_prune(self):
+        now = time.time()
+        for index in range(4):
+            entry = pathlib.Path(self.folder.name, "images", f"{index}.png")
+            entry.parent.mkdir(exist_ok=True)
+            entry.write_bytes(b"x" * 100)
+            os.utime(entry, (now - 86400 * index, now - 86400 * index))
+        pathlib.Path(self.folder.name, "icons.json").write_text("{}")
+        touch_entry(pathlib.Path(self.folder.name, "images", "3.png"))
+        self.assertEqual(  # noqa: PT009
+            prune(self.folder.name, max_age=86400 * 1.5), (1, 100)
+        )
+        self.assertEqual(prune(self.folder.name, max_size=150), (2, 200))  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            sorted(entry[0].name for entry in list_entries(self.folder.name)),
+            ["3.png"],
+        )
+        self.assertEqual(clear(self.folder.name), (2, 102))  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            list(pathlib.Path(self.folder.name).iterdir()), []
+        )
+
+    def test_prune_shards(self):
+        images = pathlib.Path(self.folder.name, "images")
+        for key in ("aa00", "aa01", "bb00"):
+            entry = entry_path(images, key, ".png")
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            entry.write_bytes(b"x" * 100)
+        os.utime(entry_path(images, "bb00", ".png"), (0, 0))
+        self.assertEqual(prune(self.folder.name, max_size=250), (1, 100))  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            sorted(folder.name for folder in images.iterdir()), ["aa"]
+        )
+
+    def test_clear_race(self):
+        lock = pathlib.Path(self.folder.name, "images", "aa", "aa00.png.lock")
+        lock.parent.mkdir(parents=True)
+        lock.write_text("")
+        pathlib.Path(self.folder.name, "icons.json").write_text("{}")
+        stat = pathlib.Path.stat
+
+        def vanish(filename, **kwargs):
+            if filename == lock:
+                raise FileNotFoundError(filename)
+            return stat(filename, **kwargs)
+
+        with mock.patch.object(pathlib.Path, "stat", vanish):
+            self.assertEqual(clear(self.folder.name), (1, 2))  # noqa: PT009
+
+    def test_runs(self):
+        record_run(self.folder.name, 3, 1)
+        record_run(self.folder.name, 4, 0)
+        self.assertEqual(  # noqa: PT009
+            [run[1:] for run in read_runs(self.folder.name)], [(3, 1), (4, 0)]
+        )
+        self.assertEqual(  # noqa: PT009
+            [run[1:] for run in read_runs(self.folder.name, 1)], [(4, 0)]
+        )
+
+    def test_runs_limit(self):
+        with (
+            mock.patch("pandoc_latex_tip._cache.MAX_STATS_SIZE", 200),
+            mock.patch("pandoc_latex_tip._cache.MAX_RUNS", 5),
+        ):
+            for misses in range(20):
+                record_run(self.folder.name, 0, misses)
+        runs = read_runs(self.folder.name)
+        self.assertLessEqual(len(runs), 15)  # noqa: PT009
+        self.assertEqual(runs[-1][2], 19)  # noqa: PT009
+
+    def test_quantity(self):
+        self.assertEqual(  # noqa: PT009
+            parse_quantity("500M", SIZE_UNITS, "size"), 500 * 2**20
+        )
+        self.assertEqual(  # noqa: PT009
+            parse_quantity("1.5k", SIZE_UNITS, "size"), 1536
+        )
+        with self.assertRaises(ValueError):  # noqa: PT027
+            parse_quantity("10 parsecs", SIZE_UNITS, "size")
+
+    def test_read_only_folders(self):
+        with tempfile.TemporaryDirectory() as prefix:
+            with mock.patch("sys.prefix", prefix):
+                collections = pathlib.Path(prefix, "share", "pandoc_latex_tip")
+                collections.mkdir(parents=True)
+                self.assertEqual(read_only_folders(""), [])  # noqa: PT009
+                installed_folder().mkdir(parents=True)
+                self.assertEqual(  # noqa: PT009
+                    read_only_folders(f"{prefix}{os.pathsep}missing"),
+                    [prefix, str(installed_folder())],
+                )
+                self.assertEqual(list(collections.iterdir()), [])  # noqa: PT009
@@ -0,0 +1,38 @@
+import itertools
+import random
+from unittest import TestCase
+
+from pandoc_latex_tip._definitions import index_definitions, match_definitions
+
+
+class DefinitionsTest(TestCase):
+    def test_index(self):
+        definitions = [
+            {"classes": {"note", "warning"}},
+            {"classes": {"note"}},
+            {"classes": {"tip", "note"}},
+        ]
+        self.assertEqual(  # noqa: PT009
+            index_definitions(definitions),
+            {"warning": [0], "note": [1], "tip": [2]},
+        )
+
+    def test_first_match(self):
+        names = ["a", "b", "c", "d", "e"]
+        generator = random.Random(0)
+        definitions = [
+            {"classes": set(generator.sample(names, generator.randint(1, 3)))}
+            for _ in range(40)
+        ]
+        index = index_definitions(definitions)
+        for count in range(len(names) + 1):
+            for classes in itertools.combinations(names, count):
+                with self.subTest(classes=classes):
+                    self.assertEqual(  # noqa: PT009
+                        list(match_definitions(definitions, index, set(classes))),
+                        [
+                            position
+                            for position, definition in enumerate(definitions)
+                            if set(classes) >= definition["classes"]
+                        ],
+                    )
@@ -0,0 +1,52 @@
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from pandoc_latex_tip._files import (
+    get_data,
+    get_digest,
+    get_font,
+    get_rules,
+    get_truetype,
+)
+from pandoc_latex_tip._icons import load_icons
+
+
+class FilesTest(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.css_file = pathlib.Path(self.folder.name, "icons.css")
+        self.css_file.write_text('.x-a:before { content: "a"; }')
+
+    def test_shared(self):
+        rules = get_rules(self.css_file)
+        self.assertEqual(rules, (("x-a", "a"),))  # noqa: PT009
+        self.assertIs(get_rules(self.css_file), rules)  # noqa: PT009
+        self.assertIs(  # noqa: PT009
+            get_rules(pathlib.Path(self.folder.name, ".", "icons.css")),
+            rules,
+        )
+
+    def test_modified(self):
+        digest = get_digest(self.css_file)
+        stat = self.css_file.stat()
+        self.css_file.write_text('.x-b:before { content: "b"; }')
+        os.utime(self.css_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(get_rules(self.css_file), (("x-b", "b"),))  # noqa: PT009
+        self.assertNotEqual(get_digest(self.css_file), digest)  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            bytes(get_data(self.css_file)),
+            b'.x-b:before { content: "b"; }',
+        )
+
+    def test_font_content(self):
+        ttf_file = load_icons()["fa-comments"].ttf_file
+        self.assertIs(  # noqa: PT009
+            get_truetype(ttf_file, 10).font_bytes,
+            get_truetype(ttf_file, 20).font_bytes,
+        )
+        self.assertEqual(  # noqa: PT009
+            get_font(ttf_file).reader.file.name, str(ttf_file.resolve())
+        )
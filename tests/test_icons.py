@@ -0,0 +1,135 @@
+import io
+import pathlib
+import tempfile
+from unittest import TestCase, mock
+
+import PIL.Image
+
+from pandoc_latex_tip._icons import (
+    IconFont,
+    IconRegistry,
+    get_core_icons,
+    load_icons,
+    save_png,
+    tint,
+)
+from pandoc_latex_tip._index import IconIndex
+
+
+class RegistryTest(TestCase):
+    def test_lazy(self):
+        icons = load_icons()
+        self.assertIn("fa-comments", icons)  # noqa: PT009
+        self.assertEqual([key[3] for key in icons.fonts], ["fa-"])  # noqa: PT009
+        self.assertNotIn("fa-unexisting", icons)  # noqa: PT009
+        self.assertNotIn("mdi-account", icons)  # noqa: PT009
+        self.assertEqual([key[3] for key in icons.fonts], ["fa-"])  # noqa: PT009
+
+    def test_prefix(self):
+        icons = load_icons()
+        self.assertEqual(  # noqa: PT009
+            icons["far-user"].ttf_file.name, "fa-regular-400.ttf"
+        )
+        self.assertEqual(  # noqa: PT009
+            icons["fab-github"].ttf_file.name, "fa-brands-400.ttf"
+        )
+        with self.assertRaises(KeyError):  # noqa: PT027
+            icons["unexisting"]
+
+    def test_shared_prefix(self):
+        definitions = [
+            *get_core_icons(),
+            {
+                "collection": "fontawesome",
+                "CSS": "brands.css",
+                "TTF": "fa-brands-400.ttf",
+                "prefix": "fa-",
+            },
+        ]
+        with tempfile.TemporaryDirectory() as folder:
+            for _ in range(2):
+                icons = IconRegistry(
+                    definitions, IconIndex(pathlib.Path(folder, "icons.json"))
+                )
+                self.assertIn("fa-comments", icons)  # noqa: PT009
+                self.assertIn("fa-github", icons)  # noqa: PT009
+                self.assertIsNot(  # noqa: PT009
+                    icons["fa-comments"], icons["fa-github"]
+                )
+
+    def test_fit_size(self):
+        icons = load_icons()
+        self.assertEqual(  # noqa: PT009
+            icons["fa-comments"].fit_size("fa-comments", 512), 407
+        )
+        self.assertEqual(  # noqa: PT009
+            icons["fa-square"].fit_size("fa-square", 512), 512
+        )
+
+    def test_pdf_bounds(self):
+        icons = load_icons()
+        for name in ("fab-meetup", "fab-usb", "fa-biohazard", "fab-staylinked"):
+            with self.subTest(name=name):
+                side, content = icons[name].pdf_page(name)
+                operators = content.decode("ascii").splitlines()
+                offset = [float(value) for value in operators[1].split()[4:6]]
+                for operator in operators[2:-1]:
+                    # The end point of each segment is on the outline
+                    values = [float(value) for value in operator.split()[-3:-1]]
+                    for index, value in enumerate(values):
+                        self.assertGreaterEqual(  # noqa: PT009
+                            value + offset[index], 0
+                        )
+                        self.assertLessEqual(  # noqa: PT009
+                            value + offset[index], side
+                        )
+
+
+class MaskTest(TestCase):
+    def test_colors(self):
+        with tempfile.TemporaryDirectory() as folder:
+            icon_font = load_icons()["fa-comments"]
+            icon_font.masks.clear()
+            with mock.patch.object(
+                IconFont, "render_mask", wraps=icon_font.render_mask
+            ) as render_mask:
+                for color in ("black", "red", "#123456"):
+                    icon_font.export_icon(
+                        "fa-comments",
+                        64,
+                        color=color,
+                        export_dir=str(pathlib.Path(folder, color)),
+                        mask_dir=str(pathlib.Path(folder, "masks")),
+                    )
+            self.assertEqual(render_mask.call_count, 1)  # noqa: PT009
+            self.assertEqual(  # noqa: PT009
+                len(list(pathlib.Path(folder, "masks").glob("**/*.png"))), 1
+            )
+            with PIL.Image.open(pathlib.Path(folder, "red", "fa-comments.png")) as red:
+                self.assertEqual(  # noqa: PT009
+                    red.getpixel((32, 32)), (255, 0, 0, 255)
+                )
+
+
+class EncodingTest(TestCase):
+    def test_palette(self):
+        mask = load_icons()["fa-comments"].render_mask("fa-comments", 75)
+        sizes = {}
+        for levels in (0, 256, 16):
+            with self.subTest(levels=levels):
+                output = io.BytesIO()
+                save_png(mask, "orange", output, (9, levels, False))
+                sizes[levels] = output.tell()
+                with PIL.Image.open(output) as image:
+                    self.assertEqual(  # noqa: PT009
+                        image.mode, "P" if levels else "RGBA"
+                    )
+                    self.assertEqual(  # noqa: PT009
+                        image.convert("RGBA").getpixel((37, 37)), (255, 165, 0, 255)
+                    )
+                    if levels != 16:
+                        self.assertEqual(  # noqa: PT009
+                            image.convert("RGBA").tobytes(),
+                            tint(mask, "orange").tobytes(),
+                        )
+        self.assertLess(sizes[16], sizes[0] / 2)  # noqa: PT009
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from panflute import convert_text
+
+# Libraries which must not be imported when all the images are cached
+HEAVY = {"PIL", "fontTools", "tinycss2", "cleo"}
+
+# Budget in microseconds of the import of the filter modules
+BUDGET = 200000
+
+SCRIPT = """
+import json
+import sys
+
+from pandoc_latex_tip{module} import {function}
+
+try:
+    {function}()
+finally:
+    print(
+        json.dumps(sorted({{name.split(".")[0] for name in sys.modules}})),
+        file=sys.stderr,
+    )
+"""
+
+
+class ImportTest(TestCase):
+    def test_import_time(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                "from pandoc_latex_tip import main",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        modules = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and line.count("|") == 2:
+                own, _, name = line[len("import time:") :].split("|")
+                if own.strip().isdigit():
+                    modules[name.strip()] = int(own)
+        self.assertIn("pandoc_latex_tip._main", modules)  # noqa: PT009
+        self.assertFalse(  # noqa: PT009
+            {name.split(".")[0] for name in modules} & HEAVY
+        )
+        self.assertLess(  # noqa: PT009
+            sum(
+                own
+                for name, own in modules.items()
+                if name.startswith("pandoc_latex_tip")
+            ),
+            BUDGET,
+        )
+
+    def test_cached_run(self):
+        source = convert_text(
+            "[a]{latex-tip-icon=fa-comments}", output_format="json"
+        ).encode()
+        with tempfile.TemporaryDirectory() as folder:
+            loaded = []
+            for _ in range(2):
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        SCRIPT.format(module="", function="main"),
+                        "latex",
+                    ],
+                    input=source,
+                    capture_output=True,
+                    check=True,
+                    env=dict(os.environ, XDG_CACHE_HOME=folder),
+                )
+                loaded.append(set(json.loads(result.stderr.splitlines()[-1])))
+            self.assertIn("PIL", loaded[0])  # noqa: PT009
+            self.assertFalse(loaded[1] & HEAVY)  # noqa: PT009
+
+            # The filter commands of the application load cleo only
+            for output_format in ("latex", "beamer", "html"):
+                with self.subTest(output_format=output_format):
+                    result = subprocess.run(
+                        [
+                            sys.executable,
+                            "-c",
+                            SCRIPT.format(module="._app", function="app"),
+                            output_format,
+                        ],
+                        input=source,
+                        capture_output=True,
+                        check=True,
+                        env=dict(
+                            os.environ, XDG_CACHE_HOME=folder, PANDOC_VERSION="3.6"
+                        ),
+                    )
+                    loaded = set(json.loads(result.stderr.splitlines()[-1]))
+                    self.assertFalse(loaded & (HEAVY - {"cleo"}))  # noqa: PT009
@@ -0,0 +1,82 @@
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from pandoc_latex_tip._index import IconIndex
+
+
+class IndexTest(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.css_file = pathlib.Path(self.folder.name, "icons.css")
+        self.ttf_file = pathlib.Path(self.folder.name, "icons.ttf")
+        self.css_file.write_text(".x-a:before { content: 'a'; }")
+        self.ttf_file.write_bytes(b"font")
+        self.filename = pathlib.Path(self.folder.name, "icons.json")
+
+    def store(self):
+        index = IconIndex(self.filename)
+        index.store(self.css_file, self.ttf_file, "x-", {"x-a": "a"})
+        index.save()
+
+    def test_lookup(self):
+        self.store()
+        index = IconIndex(self.filename)
+        self.assertEqual(  # noqa: PT009
+            index.lookup(self.css_file, self.ttf_file, "x-"),
+            {"x-a": "a"},
+        )
+        self.assertIsNone(  # noqa: PT009
+            index.lookup(self.css_file, self.ttf_file, "y-")
+        )
+
+    def test_shared_prefix(self):
+        self.store()
+        other_file = pathlib.Path(self.folder.name, "other.css")
+        other_file.write_text(".x-b:before { content: 'b'; }")
+        index = IconIndex(self.filename)
+        index.store(other_file, self.ttf_file, "x-", {"x-b": "b"})
+        index.save()
+        index = IconIndex(self.filename)
+        self.assertEqual(  # noqa: PT009
+            index.lookup(self.css_file, self.ttf_file, "x-"),
+            {"x-a": "a"},
+        )
+        self.assertEqual(  # noqa: PT009
+            index.lookup(other_file, self.ttf_file, "x-"),
+            {"x-b": "b"},
+        )
+
+    def test_touched(self):
+        self.store()
+        stat = self.ttf_file.stat()
+        os.utime(self.ttf_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        index = IconIndex(self.filename)
+        self.assertIsNotNone(  # noqa: PT009
+            index.lookup(self.css_file, self.ttf_file, "x-")
+        )
+        self.assertTrue(index.dirty)  # noqa: PT009
+
+    def test_modified(self):
+        self.store()
+        stat = self.ttf_file.stat()
+        self.ttf_file.write_bytes(b"FONT")
+        os.utime(self.ttf_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        index = IconIndex(self.filename)
+        self.assertIsNone(  # noqa: PT009
+            index.lookup(self.css_file, self.ttf_file, "x-")
+        )
+
+    def test_config(self):
+        config_path = pathlib.Path(self.folder.name, "config.yml")
+        index = IconIndex(self.filename)
+        self.assertEqual(index.definitions(config_path, list), [])  # noqa: PT009
+        index.save()
+        config_path.write_text("[]")
+        index = IconIndex(self.filename)
+        self.assertEqual(  # noqa: PT009
+            index.definitions(config_path, lambda: [{"prefix": "x-"}]),
+            [{"prefix": "x-"}],
+        )
@@ -0,0 +1,84 @@
+import os
+from unittest import TestCase, mock, skipUnless
+
+from panflute import Image, Link, Plain, convert_text
+
+from pandoc_latex_tip._latex import latex_icon, native_supported
+
+
+@skipUnless(native_supported(), "the pandoc LaTeX writer is not reproduced")
+class LatexTest(TestCase):
+    def verify_icon(self, url, height, link="", page=None):
+        attributes = {"height": height}
+        if page is not None:
+            attributes["page"] = str(page)
+        image = Image(url=url, attributes=attributes)
+        elem = image if link == "" else Link(image, url=link)
+        expected = convert_text(
+            Plain(elem),
+            input_format="panflute",
+            output_format="latex",
+        )
+        self.assertEqual(latex_icon(url, height, link, page), expected)  # noqa: PT009
+
+    def test_sizes(self):
+        for height in (
+            "18pt",
+            "12.5pt",
+            "2em",
+            "2.50em",
+            "3cm",
+            "10mm",
+            "1in",
+            "36.5",
+            "2ex",
+            "3mu",
+            "100sp",
+            "10.pt",
+        ):
+            with self.subTest(height=height):
+                self.verify_icon("icon.png", height)
+
+    def test_urls(self):
+        for url in (
+            "/home/user/.cache/pandoc_latex_tip/black/fa-comments.png",
+            "C:\\Users\\user\\icon.png",
+            "a b/c%20d.png",
+            "a#b%c{d}e^f[g]h|i`j.png",
+            "a_b~c$d&e'f\"g<h>.png",
+            "http://example.com/a%20b.png",
+        ):
+            with self.subTest(url=url):
+                self.verify_icon(url, "18pt")
+
+    def test_links(self):
+        for link in (
+            "http://www.google.fr",
+            "http://example.com/a b?q=1&r=2#frag",
+            'a{b}c^d|e<f>g"h%i',
+            "#section",
+            "#a b/é",
+            "mailto:someone@example.com",
+        ):
+            with self.subTest(link=link):
+                self.verify_icon("icon.png", "2em", link)
+
+    def test_pages(self):
+        for height in ("18pt", "2em", "3mu"):
+            with self.subTest(height=height):
+                self.verify_icon("bundle.pdf", height, "#section", 12)
+
+
+class VersionTest(TestCase):
+    def test_versions(self):
+        for version, supported in (
+            ("3.2.1", False),
+            ("3.5", False),
+            ("3.6", True),
+            ("3.6.3", True),
+            ("3.10", True),
+            ("4.0", True),
+        ):
+            with self.subTest(version=version):
+                with mock.patch.dict(os.environ, {"PANDOC_VERSION": version}):
+                    self.assertEqual(native_supported(), supported)  # noqa: PT009
@@ -0,0 +1,131 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from pandoc_latex_tip._icons import load_icons
+from pandoc_latex_tip._render import (
+    image_path,
+    pixel_size,
+    plan_icon_sets,
+    render_all,
+)
+
+
+class RenderTest(TestCase):
+    def test_pool(self):
+        icons = load_icons()
+        names = ("fa-comments", "far-user", "fab-github")
+        tasks = [
+            (
+                icons[name].css_file,
+                icons[name].ttf_file,
+                name,
+                icons[name].css_icons[name],
+                75,
+                ("black", "red"),
+            )
+            for name in names
+        ]
+        with tempfile.TemporaryDirectory() as folder:
+            progress = []
+            render_all(tasks, "png", "balanced", folder, 2, progress.append)
+            self.assertEqual(progress, [2, 2, 2])  # noqa: PT009
+            self.assertEqual(  # noqa: PT009
+                {
+                    str(image)
+                    for image in pathlib.Path(folder, "images").glob("*/*.png")
+                },
+                {
+                    image_path(folder, icons[name], name, color, "png", 75, "balanced")
+                    for name in names
+                    for color in ("black", "red")
+                },
+            )
+            self.assertEqual(  # noqa: PT009
+                len(list(pathlib.Path(folder, "masks").glob("*/*.png"))), 3
+            )
+
+    def test_key(self):
+        icons = load_icons()
+        path = image_path(
+            "cache", icons["fa-comments"], "fa-comments", "red", "png", 75, "balanced"
+        )
+        self.assertEqual(  # noqa: PT009
+            image_path(
+                "cache",
+                icons["fa-comments"],
+                "fa-comments",
+                "#FF0000",
+                "png",
+                75,
+                "balanced",
+            ),
+            path,
+        )
+        self.assertNotEqual(  # noqa: PT009
+            image_path(
+                "cache", icons["fa-message"], "fa-message", "red", "png", 75, "balanced"
+            ),
+            path,
+        )
+        self.assertNotEqual(  # noqa: PT009
+            image_path(
+                "cache",
+                icons["fa-comments"],
+                "fa-comments",
+                "red",
+                "pdf",
+                75,
+                "balanced",
+            ),
+            path.replace(".png", ".pdf"),
+        )
+        for resolution, quality, encoding in (
+            (150, "balanced", (6, 0, False)),
+            (75, "best", (6, 0, False)),
+            (75, "balanced", (6, 16, False)),
+        ):
+            with self.subTest(resolution=resolution, quality=quality):
+                self.assertNotEqual(  # noqa: PT009
+                    image_path(
+                        "cache",
+                        icons["fa-comments"],
+                        "fa-comments",
+                        "red",
+                        "png",
+                        resolution,
+                        quality,
+                        encoding,
+                    ),
+                    path,
+                )
+
+    def test_pixel_size(self):
+        for length, pixels in (
+            ("18", 75),
+            ("18pt", 75),
+            ("8pt", 34),
+            ("1in", 300),
+            ("2.54cm", 300),
+            ("2em", 84),
+            ("1000cm", 2048),
+        ):
+            with self.subTest(length=length):
+                self.assertEqual(pixel_size(length, 300, 10), pixels)  # noqa: PT009
+        with self.assertRaises(ValueError):  # noqa: PT027
+            pixel_size("3foo", 300, 10)
+
+    def test_icon_sets(self):
+        icons = load_icons()
+        with tempfile.TemporaryDirectory() as folder:
+            tasks = plan_icon_sets(
+                icons, ["far-"], ["black", "red"], "png", [75, 150], "fast", folder
+            )
+            self.assertEqual(  # noqa: PT009
+                sum(len(task[5]) for task in tasks),
+                4 * len(set(icons["far-user"].css_icons.values())),
+            )
+            self.assertEqual(  # noqa: PT009
+                {task[2][:4] for task in tasks},
+                {"far-"},
+            )
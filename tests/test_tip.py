@@ -1,9 +1,74 @@
-from unittest import TestCase
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
 
 import platformdirs
 from panflute import convert_text
 
 import pandoc_latex_tip
+from pandoc_latex_tip._engine import filter_json, load_head
+from pandoc_latex_tip._icons import load_icons
+from pandoc_latex_tip._main import latex_code, plan_images
+from pandoc_latex_tip._render import (
+    DEFAULT_DPI,
+    DEFAULT_EM_SIZE,
+    export_bundle,
+    export_image,
+    image_path,
+    pixel_size,
+)
+
+
+def image(name, color="black", image_format="png", size="18pt"):
+    """
+    Get the path of an icon image in the user cache folder.
+
+    Parameters
+    ----------
+    name
+        icon name
+    color
+        icon color
+    image_format
+        image format
+    size
+        icon size
+
+    Returns
+    -------
+    str
+        The image path.
+    """
+    return image_path(
+        platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir,
+        load_icons()[name],
+        name,
+        color,
+        image_format,
+        pixel_size(size, DEFAULT_DPI, DEFAULT_EM_SIZE),
+        "balanced",
+    )
+
+
+def as_json(value):
+    """
+    Convert a document to plain JSON values.
+
+    Parameters
+    ----------
+    value
+        panflute document or JSON document with panflute elements
+
+    Returns
+    -------
+    Any
+        The JSON values.
+    """
+    return json.loads(json.dumps(value, default=lambda elem: elem.to_json()))
 
 
 class TipTest(TestCase):
@@ -50,6 +115,15 @@ class TipTest(TestCase):
         print(expected)
         self.assertEqual(converted.strip(), expected.strip())  # noqa: PT009
 
+        # The JSON engine gives the same document
+        source = json.loads(
+            convert_text(text, input_format=input_format, output_format="json")
+        )
+        self.assertEqual(  # noqa: PT009
+            as_json(filter_json(source, load_head(source, output_format))),
+            as_json(doc),
+        )
+
     def test_span(self):
         self.verify_conversion(
             """
@@ -85,7 +159,7 @@ pandoc-latex-tip:
 \\else%%
 \\PandocLatexTipEvenRight%%
 \\fi%%
-\\marginnote{{\\href{{http://www.google.fr}}{{\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/darksalmon/fa-file-text.png}}}}\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{Tux.pdf}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\href{{http://www.google.fr}}{{\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{{image('fa-file-text', 'darksalmon', size='2em')}}}}}\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{{image('fa-comments', size='2em')}}}\\includegraphics[width=\\linewidth,height=2em,keepaspectratio]{{Tux.pdf}}}}[0pt]\\vspace{{0cm}}%%
 {{}}
 \\checkoddpage%%
 \\ifoddpage%%
@@ -93,7 +167,7 @@ pandoc-latex-tip:
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-exclamation-circle.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-exclamation-circle')}}}}}[0pt]\\vspace{{0cm}}%%
 {{}}
 \\checkoddpage%%
 \\ifoddpage%%
@@ -101,7 +175,7 @@ pandoc-latex-tip:
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 {{}}
 \\checkoddpage%%
 \\ifoddpage%%
@@ -109,7 +183,7 @@ pandoc-latex-tip:
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/orange/far-user.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('far-user', 'orange')}}}}}[0pt]\\vspace{{0cm}}%%
             """,
             pandoc_latex_tip.main,
         )
@@ -150,7 +224,7 @@ main()
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 
 \\begin{{Shaded}}
 \\begin{{Highlighting}}[]
@@ -198,7 +272,7 @@ Division
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
             """,
             pandoc_latex_tip.main,
         )
@@ -220,7 +294,7 @@ Division
 \\else%%
 \\PandocLatexTipEvenRight%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.33333in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/lightskyblue/fa-address-book.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.33333in,keepaspectratio]{{{image('fa-address-book', 'lightskyblue', size='24pt')}}}}}[0pt]\\vspace{{0cm}}%%
             """,
             pandoc_latex_tip.main,
         )
@@ -284,7 +358,7 @@ Division
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
             """,
             pandoc_latex_tip.main,
         )
@@ -324,7 +398,7 @@ pandoc-latex-tip:
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 
 \\begin{{center}}\\rule{{0.5\\linewidth}}{{0.5pt}}\\end{{center}}
             """,
@@ -368,7 +442,7 @@ Lineblock
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 \\\\
 continue
             """,
@@ -412,7 +486,7 @@ main()
 \\else%%
 \\PandocLatexTipEvenLeft%%
 \\fi%%
-\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 
 \\begin{{Shaded}}
 \\begin{{Highlighting}}[]
@@ -463,10 +537,325 @@ pandoc-latex-tip:
   \\else%%
   \\PandocLatexTipEvenLeft%%
   \\fi%%
-  \\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir}/black/fa-comments.png}}}}[0pt]\\vspace{{0cm}}%%
+  \\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments')}}}}}[0pt]\\vspace{{0cm}}%%
 \\item
   b
 \\end{{itemize}}
             """,
             pandoc_latex_tip.main,
         )
+
+    def test_pdf(self):
+        self.verify_conversion(
+            """
+---
+pandoc-latex-tip-image-format: pdf
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: fa-comments
+---
+
+[]{.warning}
+            """,
+            f"""
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image('fa-comments', 'black', 'pdf')}}}}}[0pt]\\vspace{{0cm}}%%
+            """,
+            pandoc_latex_tip.main,
+        )
+
+    def test_cache_path(self):
+        with tempfile.TemporaryDirectory() as folder:
+            icons = load_icons()
+            export_image(
+                icons["fa-comments"],
+                "fa-comments",
+                "black",
+                "png",
+                pixel_size("18pt", DEFAULT_DPI, DEFAULT_EM_SIZE),
+                "balanced",
+                folder,
+            )
+            with mock.patch.dict(os.environ, {"PANDOC_LATEX_TIP_CACHE_PATH": folder}):
+                self.verify_conversion(
+                    """
+---
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: fa-comments
+---
+
+[]{.warning}
+                    """,
+                    f"""
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio]{{{image_path(folder, icons['fa-comments'], 'fa-comments', 'black', 'png', 75, 'balanced')}}}}}[0pt]\\vspace{{0cm}}%%
+                    """,
+                    pandoc_latex_tip.main,
+                )
+
+    def test_resolution(self):
+        with mock.patch.dict(
+            os.environ,
+            {"PANDOC_LATEX_TIP_DPI": "600", "PANDOC_LATEX_TIP_QUALITY": "fast"},
+        ):
+            self.verify_conversion(
+                """
+[]{latex-tip-icon=fa-comments latex-tip-size=8pt}
+                """,
+                f"""
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.11111in,keepaspectratio]{{{image_path(platformdirs.AppDirs('pandoc_latex_tip').user_cache_dir, load_icons()['fa-comments'], 'fa-comments', 'black', 'png', 67, 'fast')}}}}}[0pt]\\vspace{{0cm}}%%
+                """,
+                pandoc_latex_tip.main,
+            )
+
+    def test_attribute_memo(self):
+        doc = convert_text(
+            """
+[a]{latex-tip-icon=fa-comments latex-tip-color=red}
+[b]{latex-tip-icon=fa-comments latex-tip-color=red}
+[c]{latex-tip-color=red latex-tip-icon=fa-comments}
+[d]{latex-tip-icon=fa-comments}
+            """,
+            standalone=True,
+        )
+        doc.format = "latex"
+        with mock.patch(
+            "pandoc_latex_tip._main.latex_code",
+            wraps=latex_code,
+        ) as wrapper:
+            doc = pandoc_latex_tip.main(doc)
+        self.assertEqual(wrapper.call_count, 2)  # noqa: PT009
+        self.assertEqual(doc.attribute_hits, 2)  # noqa: PT009
+        self.assertEqual(doc.attribute_misses, 2)  # noqa: PT009
+
+    def test_lazy_definitions(self):
+        doc = convert_text(
+            """
+---
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: [fa-unexisting]
+  - classes: [warning]
+    icons: fa-comments
+  - classes: [note]
+    icons: fa-address-book
+  - classes: [tip]
+    icons: fa-bug
+---
+
+[a]{.warning} [b]{.warning}
+            """,
+            standalone=True,
+        )
+        doc.format = "latex"
+        with mock.patch(
+            "pandoc_latex_tip._main.latex_code",
+            wraps=latex_code,
+        ) as wrapper:
+            doc = pandoc_latex_tip.main(doc)
+        self.assertEqual(wrapper.call_count, 2)  # noqa: PT009
+        self.assertEqual(  # noqa: PT009
+            [definition["latex"] is None for definition in doc.defined],
+            [False, False, True, True],
+        )
+        self.assertIn(  # noqa: PT009
+            image("fa-comments"),
+            convert_text(doc, input_format="panflute", output_format="latex"),
+        )
+
+    def test_planned_fall_through(self):
+        doc = convert_text(
+            """
+---
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: [fa-unexisting]
+  - classes: [warning]
+    icons: fa-comments
+---
+
+[a]{.warning}
+            """,
+            standalone=True,
+        )
+        doc.format = "latex"
+        with mock.patch(
+            "pandoc_latex_tip._main.plan_images",
+            wraps=plan_images,
+        ) as wrapper:
+            doc = pandoc_latex_tip.main(doc)
+        self.assertEqual(  # noqa: PT009
+            [icon["name"] for icon in wrapper.call_args.args[1]],
+            ["fa-comments"],
+        )
+
+    def test_pass_through(self):
+        doc = convert_text("[a]{.warning latex-tip-icon=fa-comments}", standalone=True)
+        doc.format = "html"
+        doc = pandoc_latex_tip.main(doc)
+        self.assertNotIn("header-includes", doc.metadata)  # noqa: PT009
+        self.assertFalse(hasattr(doc, "icons"))  # noqa: PT009
+
+        source = convert_text(
+            "[a]{latex-tip-icon=fa-comments}", output_format="json"
+        ).encode()
+        with tempfile.TemporaryDirectory() as folder:
+            for entry in ("_main.main", "_app.app"):
+                for output_format in ("html", "docx"):
+                    with self.subTest(entry=entry, output_format=output_format):
+                        module, function = entry.split(".")
+                        result = subprocess.run(
+                            [
+                                sys.executable,
+                                "-c",
+                                f"from pandoc_latex_tip.{module} import {function}; "
+                                f"{function}()",
+                                output_format,
+                            ],
+                            input=source,
+                            capture_output=True,
+                            check=True,
+                            env=dict(
+                                os.environ, XDG_CACHE_HOME=folder, PANDOC_VERSION="3.6"
+                            ),
+                        )
+                        self.assertEqual(result.stdout, source)  # noqa: PT009
+            self.assertEqual(list(pathlib.Path(folder).iterdir()), [])  # noqa: PT009
+
+    def test_commands(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for environ in ({}, {"PANDOC_VERSION": "3.6"}):
+                with self.subTest(environ=environ):
+                    result = subprocess.run(
+                        [
+                            sys.executable,
+                            "-c",
+                            "from pandoc_latex_tip._app import app; app()",
+                            "cache",
+                            "stats",
+                        ],
+                        stdin=subprocess.DEVNULL,
+                        capture_output=True,
+                        check=True,
+                        text=True,
+                        env=dict(os.environ, XDG_CACHE_HOME=folder, **environ),
+                    )
+                    self.assertIn("Cache dir", result.stdout)  # noqa: PT009
+                    result = subprocess.run(
+                        [
+                            sys.executable,
+                            "-c",
+                            "from pandoc_latex_tip._app import app; app()",
+                            "cache",
+                        ],
+                        stdin=subprocess.DEVNULL,
+                        capture_output=True,
+                        check=False,
+                        env=dict(os.environ, XDG_CACHE_HOME=folder, **environ),
+                    )
+                    self.assertNotEqual(result.returncode, 0)  # noqa: PT009
+
+    def test_engine(self):
+        source = convert_text(
+            """
+---
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: fa-comments
+---
+
+[a]{.warning} `b`{latex-tip-icon=far-user latex-tip-color=orange}
+
+::: warning
+- item
+:::
+            """,
+            output_format="json",
+        ).encode()
+        outputs = []
+        for engine in ("panflute", "json"):
+            with self.subTest(engine=engine):
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        "import pandoc_latex_tip._main as m; m.main()",
+                        "latex",
+                    ],
+                    input=source,
+                    capture_output=True,
+                    check=True,
+                    env=dict(os.environ, PANDOC_LATEX_TIP_ENGINE=engine),
+                )
+                outputs.append(json.loads(result.stdout))
+        self.assertEqual(outputs[0], outputs[1])  # noqa: PT009
+        self.assertIn("RawInline", json.dumps(outputs[1]))  # noqa: PT009
+
+    def test_bundle(self):
+        icons = load_icons()
+        bundle = export_bundle(
+            [
+                (icons["fa-comments"], "fa-comments", "black"),
+                (icons["far-user"], "far-user", "orange"),
+            ],
+            platformdirs.AppDirs("pandoc_latex_tip").user_cache_dir,
+        )[0]
+        self.verify_conversion(
+            """
+---
+pandoc-latex-tip-bundle: true
+pandoc-latex-tip:
+  - classes: [warning]
+    icons: fa-comments
+---
+
+[]{.warning}[]{latex-tip-icon=far-user latex-tip-color=orange}[]{.warning}
+            """,
+            f"""
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio,page=1]{{{bundle}}}}}[0pt]\\vspace{{0cm}}%%
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio,page=2]{{{bundle}}}}}[0pt]\\vspace{{0cm}}%%
+{{}}
+\\checkoddpage%%
+\\ifoddpage%%
+\\PandocLatexTipOddLeft%%
+\\else%%
+\\PandocLatexTipEvenLeft%%
+\\fi%%
+\\marginnote{{\\includegraphics[width=\\linewidth,height=0.25in,keepaspectratio,page=1]{{{bundle}}}}}[0pt]\\vspace{{0cm}}%%
+            """,
+            pandoc_latex_tip.main,
+        )
@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+from panflute import Code, CodeBlock, Div, RawInline, Span, convert_text
+
+from pandoc_latex_tip._walk import walk_candidates
+
+MARKDOWN = """
+---
+title: A [title]{.a}
+---
+
+Text [span [nested]{.b}]{.a} and `code`{.c} with a note^[A [note]{.d}.]
+
+::: {.e}
+- [item]{.f}
+
+  ```{.g}
+  block
+  ```
+:::
+
+| Head [cell]{.h} |
+|-----------------|
+| [Body]{.i}      |
+
+Term [one]{.j}
+:   Definition [one]{.k}
+
+![Caption [image]{.l}](image.png)
+"""
+
+
+def mark(elem, _doc):
+    if isinstance(elem, Span | Code):
+        return [elem, RawInline("".join(elem.classes), "tex")]
+    return None
+
+
+class WalkTest(TestCase):
+    def test_order(self):
+        expected = []
+        visited = []
+        convert_text(MARKDOWN, standalone=True).walk(
+            lambda elem, _doc: (
+                expected.append(elem.to_json())
+                if isinstance(elem, Span | Div | Code | CodeBlock)
+                else None
+            )
+        )
+        doc = convert_text(MARKDOWN, standalone=True)
+        walk_candidates(doc, lambda elem, _doc: visited.append(elem.to_json()), doc)
+        self.assertEqual(visited, expected)  # noqa: PT009
+
+    def test_replacement(self):
+        expected = convert_text(MARKDOWN, standalone=True)
+        expected = expected.walk(mark, expected)
+        doc = convert_text(MARKDOWN, standalone=True)
+        walk_candidates(doc, mark, doc)
+        self.assertEqual(doc.to_json(), expected.to_json())  # noqa: PT009